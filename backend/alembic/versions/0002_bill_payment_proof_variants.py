@@ -0,0 +1,32 @@
+"""bill payment proof variants
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 22:57:37.846275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payment_proof_thumbnail', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('payment_proof_preview', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.drop_column('payment_proof_preview')
+        batch_op.drop_column('payment_proof_thumbnail')
@@ -0,0 +1,49 @@
+"""billing summary tables
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 23:18:01.731764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bill_monthly_summary',
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('payment_status', sa.String(), nullable=False),
+    sa.Column('bill_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('period', 'payment_status')
+    )
+    op.create_table('bill_package_summary',
+    sa.Column('package_id', sa.Integer(), nullable=False),
+    sa.Column('payment_status', sa.String(), nullable=False),
+    sa.Column('bill_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('package_id', 'payment_status')
+    )
+    op.create_table('receivable_due_summary',
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.Column('bill_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('due_date')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('receivable_due_summary')
+    op.drop_table('bill_package_summary')
+    op.drop_table('bill_monthly_summary')
@@ -0,0 +1,55 @@
+"""ticket search index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 23:36:14.292600
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE ticket_search USING fts5("
+            "title, description, replies, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO ticket_search (rowid, title, description, replies) "
+            "SELECT t.id, t.title, t.description, "
+            "(SELECT group_concat(r.message, char(10)) FROM ticket_replies r WHERE r.ticket_id = t.id) "
+            "FROM support_tickets t"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE ticket_search ("
+            "ticket_id INTEGER PRIMARY KEY REFERENCES support_tickets (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "INSERT INTO ticket_search (ticket_id, document) "
+            "SELECT t.id, "
+            "setweight(to_tsvector('simple', coalesce(t.title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(t.description, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce("
+            "(SELECT string_agg(r.message, ' ') FROM ticket_replies r WHERE r.ticket_id = t.id), '')), 'C') "
+            "FROM support_tickets t"
+        )
+        op.execute("CREATE INDEX ix_ticket_search_document ON ticket_search USING GIN (document)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS ticket_search")
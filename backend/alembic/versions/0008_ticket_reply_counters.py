@@ -0,0 +1,56 @@
+"""ticket reply counters
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 23:39:19.093733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority_rank', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_reply_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+
+    op.execute(
+        "UPDATE support_tickets SET "
+        "priority_rank = CASE priority WHEN 'low' THEN 0 WHEN 'high' THEN 2 WHEN 'urgent' THEN 3 ELSE 1 END, "
+        "reply_count = (SELECT count(*) FROM ticket_replies r WHERE r.ticket_id = support_tickets.id), "
+        "last_reply_at = (SELECT max(r.created_at) FROM ticket_replies r WHERE r.ticket_id = support_tickets.id), "
+        "last_activity_at = coalesce("
+        "(SELECT max(r.created_at) FROM ticket_replies r WHERE r.ticket_id = support_tickets.id), "
+        "created_at, opened_at, last_activity_at)"
+    )
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_support_tickets_inbox', ['status', 'priority_rank', 'last_activity_at', 'id'], unique=False)
+
+    with op.batch_alter_table('ticket_replies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ticket_replies_ticket_id'), ['ticket_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ticket_replies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_replies_ticket_id'))
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_support_tickets_inbox')
+        batch_op.drop_column('last_activity_at')
+        batch_op.drop_column('last_reply_at')
+        batch_op.drop_column('reply_count')
+        batch_op.drop_column('priority_rank')
@@ -0,0 +1,46 @@
+"""payment inbox
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:06:17.383665
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payment_inbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id')
+    )
+    with op.batch_alter_table('payment_inbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payment_inbox_id'), ['id'], unique=False)
+        batch_op.create_index('ix_payment_inbox_pending', ['processed_at', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('payment_inbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_inbox_pending')
+        batch_op.drop_index(batch_op.f('ix_payment_inbox_id'))
+
+    op.drop_table('payment_inbox')
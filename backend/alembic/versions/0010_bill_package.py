@@ -0,0 +1,46 @@
+"""bill package
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:07:25.739426
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('package_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_bills_package_id', 'packages', ['package_id'], ['id'])
+
+    # Bills so far were billed for their subscription's current package
+    op.execute(
+        "UPDATE bills SET package_id = "
+        "(SELECT s.package_id FROM subscriptions s WHERE s.id = bills.subscription_id)"
+    )
+
+    # Re-key the package summary on the bills' own package
+    op.execute("DELETE FROM bill_package_summary")
+    op.execute(
+        "INSERT INTO bill_package_summary (package_id, payment_status, bill_count, total_amount) "
+        "SELECT package_id, payment_status, count(*), coalesce(sum(total_amount), 0) "
+        "FROM bills WHERE package_id IS NOT NULL GROUP BY package_id, payment_status"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_bills_package_id', type_='foreignkey')
+        batch_op.drop_column('package_id')
@@ -0,0 +1,33 @@
+"""subscription end dates
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:10:38.188789
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ended subscriptions without an end date: their last change is the
+    # best record of when they ended, and it stops moving from here on
+    op.execute(
+        "UPDATE subscriptions SET end_date = coalesce(updated_at, created_at) "
+        "WHERE status IN ('cancelled', 'inactive') AND end_date IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Backfilled end dates cannot be told apart from real ones; keep them
@@ -0,0 +1,41 @@
+"""ticket status rank
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 00:14:02.751888
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_rank', sa.Integer(), server_default='3', nullable=False))
+
+    op.execute(
+        "UPDATE support_tickets SET status_rank = "
+        "CASE status WHEN 'closed' THEN 0 WHEN 'resolved' THEN 1 WHEN 'in_progress' THEN 2 ELSE 3 END"
+    )
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_support_tickets_inbox')
+        batch_op.create_index('ix_support_tickets_inbox', ['status_rank', 'priority_rank', 'last_activity_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_support_tickets_inbox')
+        batch_op.create_index('ix_support_tickets_inbox', ['status', 'priority_rank', 'last_activity_at', 'id'], unique=False)
+        batch_op.drop_column('status_rank')
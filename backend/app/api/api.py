@@ -1,10 +1,15 @@
 from fastapi import APIRouter
 
-from .endpoints import auth, users, packages, subscriptions, bills
+from .endpoints import auth, users, packages, subscriptions, bills, payments, reports, exports, jobs, tickets
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(packages.router, prefix="/packages", tags=["packages"])
 api_router.include_router(subscriptions.router, prefix="/subscriptions", tags=["subscriptions"])
-api_router.include_router(bills.router, prefix="/bills", tags=["billing"])
\ No newline at end of file
+api_router.include_router(bills.router, prefix="/bills", tags=["billing"])
+api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(tickets.router, prefix="/tickets", tags=["support"])
@@ -1,24 +1,45 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from typing import List, Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, UploadFile, File
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import os
-from datetime import datetime, timedelta
-import pathlib
+from datetime import datetime
 
 from ...api.deps import get_db, get_current_active_user, get_current_admin
+from ...core.config import settings
+from ...core.responses import list_response
+from ...core.storage import content_disposition, content_store, is_digest
+from ...core.validation import validate_upload
 from ...models.user import User
-from ...models.bill import Bill, PaymentStatus
+from ...models.bill import Bill
+from ...services.invoices import (
+    INVOICE_JOB_KIND,
+    INVOICE_MEDIA_TYPE,
+    ensure_invoice,
+    invoice_batch_job,
+    invoice_filename,
+    invoice_sources,
+)
+from ...services.jobs import create_job, job_out, run_job
+from ...services.payment_proofs import generate_proof_variants, legacy_proof_path, record_proof, variant_keys
+from ...services.payments import VERIFIABLE_STATUSES, mark_bill_paid
+from ...services.qris import bill_number as qris_bill_number, bill_reference, prerender_unpaid_bills, qris_for_bill, qris_images
+from ...services.stored_files import get_stored_file, stored_file_response
 from ...schemas.bill import (
     Bill as BillSchema,
     BillDetail,
     BillCreate,
     BillUpdate,
-    BillPaymentUpdate
+    BillPaymentUpdate,
+    InvoiceBatchCreate,
 )
+from ...schemas.job import Job as JobSchema
 
 router = APIRouter()
 
+QRIS_PROOF_TYPES = ("image/jpeg", "image/png", "application/pdf")
+
 
 @router.get("/", response_model=List[BillSchema])
 def read_bills(
@@ -31,7 +52,7 @@ def read_bills(
     Retrieve all bills. Admin only.
     """
     bills = db.query(Bill).offset(skip).limit(limit).all()
-    return bills
+    return list_response(BillSchema, bills)
 
 
 @router.get("/me", response_model=List[BillSchema])
@@ -45,7 +66,7 @@ def read_my_bills(
     Retrieve current user's bills.
     """
     bills = db.query(Bill).filter(Bill.user_id == current_user.id).offset(skip).limit(limit).all()
-    return bills
+    return list_response(BillSchema, bills)
 
 
 @router.post("/", response_model=BillSchema)
@@ -144,8 +165,6 @@ def update_bill(
         bill.payment_method = bill_in.payment_method
     if bill_in.payment_date is not None:
         bill.payment_date = bill_in.payment_date
-    if bill_in.payment_proof is not None:
-        bill.payment_proof = bill_in.payment_proof
     if bill_in.payment_reference is not None:
         bill.payment_reference = bill_in.payment_reference
     if bill_in.notes is not None:
@@ -187,9 +206,6 @@ def pay_bill(
     bill.payment_method = payment_in.payment_method
     bill.payment_date = payment_in.payment_date
     
-    if payment_in.payment_proof:
-        bill.payment_proof = payment_in.payment_proof
-        
     if payment_in.payment_reference:
         bill.payment_reference = payment_in.payment_reference
     
@@ -205,12 +221,14 @@ async def upload_payment_proof(
     db: Session = Depends(get_db),
     bill_id: int,
     file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Upload payment proof for a bill.
     """
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    # Database work runs in the threadpool so concurrent uploads keep streaming
+    bill = await run_in_threadpool(db.query(Bill).filter(Bill.id == bill_id).first)
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -224,28 +242,17 @@ async def upload_payment_proof(
             detail="Not enough permissions",
         )
     
-    # Save the uploaded file
-    upload_dir = "uploads/payment_proofs"
-    os.makedirs(upload_dir, exist_ok=True)
+    # Check the real file type and image dimensions from the header only
+    detected = await validate_upload(file)
     
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"payment_proof_{bill_id}_{current_user.id}_{timestamp}{file_extension}"
-    file_path = os.path.join(upload_dir, filename)
+    # Stream the file into the content store, enforcing the size limit while reading
+    blob = await content_store.save_upload(file)
     
-    # Write the file
-    contents = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    # Update bill with the proof's content hash; awaiting admin verification
+    bill = await record_proof(db, bill, blob, detected.content_type, detected.extension)
     
-    # Update bill with the proof path
-    bill.payment_proof = file_path
-    bill.payment_status = PaymentStatus.PENDING  # Change to pending for admin verification
-    
-    db.add(bill)
-    db.commit()
-    db.refresh(bill)
+    # Thumbnail and preview are rendered after the response is sent
+    background_tasks.add_task(generate_proof_variants, bill.id, blob.digest, detected.extension)
     
     return bill
 
@@ -267,22 +274,180 @@ def verify_payment(
             detail="Bill not found",
         )
     
-    # Only pending payments can be verified
-    if bill.payment_status != PaymentStatus.PENDING:
+    # Only unpaid bills, with or without a submitted proof, can be verified
+    if bill.payment_status not in VERIFIABLE_STATUSES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot verify payment with status {bill.payment_status}",
         )
     
-    # Update payment status to paid
-    bill.payment_status = PaymentStatus.PAID
+    # Update payment status to paid and advance the subscription's billing dates
+    mark_bill_paid(bill, bill.payment_date or datetime.now())
     
     db.add(bill)
     db.commit()
     db.refresh(bill)
     return bill
 
+@router.get("/{bill_id}/payment-proof")
+def download_payment_proof(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    bill_id: int,
+    variant: str = Query("original", pattern="^(original|thumbnail|preview)$"),
+    v: Optional[str] = Query(None, description="Content hash the URL is pinned to"),
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Download the payment proof of a bill, or its thumbnail/preview.
+    Supports Range and If-None-Match. Responses are revalidated, unless
+    `v` pins the URL to the current proof's hash: those can be cached for
+    good, since a new proof comes with a new URL.
+    """
+    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    
+    if not bill:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bill not found",
+        )
+    
+    # Check permissions: users can only access their own bills, admins can access all
+    if bill.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    if not bill.payment_proof:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment proof not found",
+        )
+    
+    # Proofs uploaded before content-addressed storage are plain file paths
+    if not is_digest(bill.payment_proof):
+        legacy_path = legacy_proof_path(bill.payment_proof)
+        if variant != "original" or legacy_path is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Payment proof not found",
+            )
+        return FileResponse(legacy_path, filename=os.path.basename(legacy_path), content_disposition_type="inline")
+    
+    stored = get_stored_file(db, bill.payment_proof)
+    if not stored:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment proof not found",
+        )
+    
+    pinned = v == stored.sha256
+    if variant == "original":
+        return stored_file_response(
+            request,
+            stored,
+            content_store.key_for(stored.sha256),
+            filename=f"payment-proof-{bill.id}{stored.extension or ''}",
+            immutable=pinned,
+        )
+    
+    thumbnail_key, preview_key = variant_keys(stored.sha256)
+    key = thumbnail_key if variant == "thumbnail" else preview_key
+    if (bill.payment_proof_thumbnail if variant == "thumbnail" else bill.payment_proof_preview) != key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment proof variant not available",
+        )
+    return stored_file_response(
+        request,
+        stored,
+        key,
+        filename=f"payment-proof-{bill.id}-{variant}.webp",
+        media_type="image/webp",
+        etag_suffix=f"-{variant}",
+        immutable=pinned,
+    )
+
+
+@router.post("/invoices/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+def create_invoice_batch_job(
+    *,
+    db: Session = Depends(get_db),
+    batch_in: InvoiceBatchCreate,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Render every invoice of a billing cycle in the background. Admin only.
+    Poll GET /jobs/{id} for progress; its download_url streams all the
+    invoices as one ZIP.
+    """
+    if batch_in.end <= batch_in.start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start",
+        )
+    
+    params = {"start": batch_in.start.isoformat(), "end": batch_in.end.isoformat()}
+    job = create_job(db, INVOICE_JOB_KIND, current_user.id, params)
+    background_tasks.add_task(run_job, job.id, invoice_batch_job)
+    return job_out(job)
+
+
+@router.get("/{bill_id}/invoice")
+async def download_invoice(
+    *,
+    db: Session = Depends(get_db),
+    bill_id: int,
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Download the PDF invoice of a bill.
+    Rendered once per version of the bill, then served from the file cache.
+    """
+    bill = await run_in_threadpool(db.query(Bill).filter(Bill.id == bill_id).first)
+    
+    if not bill:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bill not found",
+        )
+    
+    # Check permissions: users can only access their own bills, admins can access all
+    if bill.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    sources = await run_in_threadpool(invoice_sources, db, [bill.id])
+    key = await ensure_invoice(sources[bill.id])
+    return content_store.serve(
+        key,
+        INVOICE_MEDIA_TYPE,
+        invoice_filename(bill.id),
+        headers={"Cache-Control": "private, no-cache"},
+    )
+
+
 # QRIS Payment endpoints
+@router.post("/qris/prerender", status_code=status.HTTP_202_ACCEPTED)
+def prerender_qris_images(
+    *,
+    background_tasks: BackgroundTasks,
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Pre-render QRIS images for all unpaid bills, e.g. right after a billing run. Admin only.
+    Only bills created since `since` are included when it is given.
+    """
+    background_tasks.add_task(prerender_unpaid_bills, since)
+    return {"message": "QRIS pre-rendering started"}
+
+
 @router.get("/{bill_id}/qris")
 def get_qris_data(
     *,
@@ -308,28 +473,31 @@ def get_qris_data(
             detail="Not enough permissions",
         )
     
-    # Static QRIS data with your existing QRIS image
+    # Dynamic QRIS carrying this bill's amount and reference
+    code = qris_for_bill(bill.id, bill.total_amount)
+    download_url = f"{settings.API_V1_STR}/bills/{bill_id}/qris/download"
     qris_data = {
         "billId": bill.id,
         "amount": bill.total_amount,
-        "merchantName": "SEKAR NET",
-        "merchantCity": "Jakarta",
-        "postalCode": "12345",
-        "billNumber": f"BILL-{bill.id:06d}",
-        "reference1": f"REF-{bill.id}",
+        "merchantName": settings.QRIS_MERCHANT_NAME,
+        "merchantCity": settings.QRIS_MERCHANT_CITY,
+        "postalCode": settings.QRIS_POSTAL_CODE,
+        "billNumber": qris_bill_number(bill.id),
+        "reference1": bill_reference(bill.id, code.window),
         "reference2": bill.description or f"Period {bill.bill_date.strftime('%B %Y')}",
-        "qrImageUrl": "/assets/qris-sekar-net.png",  # Path to your QRIS image
-        "validUntil": (datetime.now() + timedelta(hours=24)).isoformat()  # 24 hours
+        "qrisPayload": code.payload,
+        "qrImageUrl": download_url,
+        "validUntil": code.valid_until.isoformat()
     }
     
     return {
         "qrisData": qris_data,
-        "downloadUrl": f"/api/bills/{bill_id}/qris/download",
+        "downloadUrl": download_url,
         "instructions": [
             "1. Buka aplikasi e-wallet atau mobile banking Anda",
             "2. Pilih fitur Scan QRIS",
             "3. Scan kode QR di atas",
-            "4. Masukkan nominal pembayaran sesuai tagihan",
+            "4. Pastikan nominal yang tampil sesuai tagihan (sudah terisi otomatis)",
             "5. Periksa detail pembayaran",
             "6. Konfirmasi pembayaran",
             "7. Simpan bukti pembayaran",
@@ -369,21 +537,18 @@ def download_qris_image(
             detail="Not enough permissions",
         )
     
-    # Path to your static QRIS image
-    qris_image_path = pathlib.Path("public/assets/qris-sekar-net.png")
-    
-    # Check if file exists
-    if not qris_image_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="QRIS image not found",
-        )
-    
-    # Return the file for download
-    return FileResponse(
-        path=qris_image_path,
-        filename=f"qris-sekar-net-bill-{bill_id}.png",
-        media_type="image/png"
+    # Rendered once per (bill, amount, validity window), then served from cache
+    code = qris_for_bill(bill.id, bill.total_amount)
+    png = qris_images.get_or_render(code)
+    max_age = max(int((code.valid_until - datetime.now()).total_seconds()), 0)
+    
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={
+            "Content-Disposition": content_disposition(f"qris-sekar-net-bill-{bill_id}.png", "attachment"),
+            "Cache-Control": f"private, max-age={max_age}",
+        },
     )
 
 
@@ -393,12 +558,13 @@ async def verify_qris_payment(
     db: Session = Depends(get_db),
     bill_id: int,
     file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Submit payment proof for QRIS payment verification.
     """
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    bill = await run_in_threadpool(db.query(Bill).filter(Bill.id == bill_id).first)
     
     if not bill:
         raise HTTPException(
@@ -413,36 +579,15 @@ async def verify_qris_payment(
             detail="Not enough permissions",
         )
     
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "application/pdf"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}",
-        )
+    # Validate file type from magic bytes (not the client-supplied type)
+    # and image dimensions from the header, before anything is decoded
+    detected = await validate_upload(file, allowed_types=QRIS_PROOF_TYPES)
     
-    # Validate file size (2MB limit)
-    if file.size > 2 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large. Maximum size is 2MB",
-        )
-    
-    # Create uploads directory if it doesn't exist
-    uploads_dir = pathlib.Path("uploads/payment-proofs")
-    uploads_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = pathlib.Path(file.filename).suffix
-    filename = f"payment-proof-{bill_id}-{timestamp}{file_extension}"
-    file_path = uploads_dir / filename
-    
-    # Save the file
+    # Save the file; the 2MB limit is enforced while streaming
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        blob = await content_store.save_upload(file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -450,14 +595,12 @@ async def verify_qris_payment(
         )
     
     # Update bill with payment proof
-    bill.payment_proof = str(file_path)
-    bill.payment_status = PaymentStatus.PENDING_VERIFICATION
-    bill.payment_date = datetime.now()
+    bill = await record_proof(db, bill, blob, detected.content_type, detected.extension, datetime.now())
     
-    db.commit()
-    db.refresh(bill)
+    # Thumbnail and preview are rendered after the response is sent
+    background_tasks.add_task(generate_proof_variants, bill.id, blob.digest, detected.extension)
     
     return {
         "message": "Payment proof uploaded successfully",
-        "bill": bill
+        "bill": BillSchema.model_validate(bill)
     }
\ No newline at end of file
@@ -0,0 +1,132 @@
+import os
+from datetime import datetime
+from typing import Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+
+from ...api.deps import get_db, get_current_admin
+from ...core.config import settings
+from ...core.storage import content_disposition
+from ...models.user import User
+from ...schemas.export import ExportJobCreate
+from ...schemas.job import Job as JobSchema
+from ...services.exports import (
+    XLSX_MEDIA_TYPE,
+    ExportDataset,
+    count_rows,
+    export_filename,
+    iter_csv,
+    parse_columns,
+    write_xlsx,
+    xlsx_export_job,
+)
+from ...services.jobs import create_job, job_out, job_temp_path, run_job
+
+router = APIRouter()
+
+
+@router.get("/{dataset}.csv")
+def export_csv(
+    dataset: ExportDataset,
+    columns: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Stream bills, users or subscriptions as CSV. Admin only.
+    `columns` is a comma-separated list (defaults to the common ones);
+    `start` (inclusive) and `end` (exclusive) filter on the bill date,
+    registration date or subscription start date.
+    """
+    try:
+        names = parse_columns(dataset, columns)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return StreamingResponse(
+        iter_csv(dataset, names, start, end),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": content_disposition(export_filename(dataset, "csv"), "attachment")},
+    )
+
+
+@router.get("/{dataset}.xlsx")
+def export_xlsx(
+    dataset: ExportDataset,
+    columns: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Export bills, users or subscriptions as an Excel workbook. Admin only.
+    Same options as the CSV export. Ranges over EXPORT_XLSX_INLINE_MAX_ROWS
+    rows must be exported with POST /exports/jobs instead.
+    """
+    try:
+        names = parse_columns(dataset, columns)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    rows = count_rows(db, dataset, start, end)
+    if rows > settings.EXPORT_XLSX_INLINE_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{rows} rows is too many for a direct download; use POST {settings.API_V1_STR}/exports/jobs",
+        )
+    
+    path = job_temp_path(".xlsx")
+    try:
+        write_xlsx(path, dataset, names, start, end)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=export_filename(dataset, "xlsx"),
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@router.post("/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(
+    *,
+    db: Session = Depends(get_db),
+    job_in: ExportJobCreate,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Export a large range as XLSX in the background. Admin only.
+    Poll GET /jobs/{id} for progress; download_url is set when it is done.
+    """
+    try:
+        dataset = ExportDataset(job_in.dataset)
+        names = parse_columns(dataset, job_in.columns)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    params = {
+        "dataset": dataset.value,
+        "columns": names,
+        "start": job_in.start.isoformat() if job_in.start else None,
+        "end": job_in.end.isoformat() if job_in.end else None,
+    }
+    job = create_job(db, "export", current_user.id, params)
+    background_tasks.add_task(run_job, job.id, xlsx_export_job)
+    return job_out(job)
@@ -0,0 +1,85 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ...api.deps import get_db, get_current_admin
+from ...core.storage import content_disposition, content_store
+from ...models.job import Job, JobStatus
+from ...models.user import User
+from ...schemas.job import Job as JobSchema
+from ...services.invoices import (
+    INVOICE_JOB_KIND,
+    missing_invoices,
+    read_invoice_manifest,
+    stream_invoice_archive,
+)
+from ...services.jobs import job_out
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=JobSchema)
+def read_job(
+    *,
+    db: Session = Depends(get_db),
+    job_id: str,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Status and progress of a background job. Admin only.
+    """
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return job_out(job)
+
+
+@router.get("/{job_id}/download")
+async def download_job_result(
+    *,
+    db: Session = Depends(get_db),
+    job_id: str,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Download the result of a finished job. Admin only.
+    """
+    job = await run_in_threadpool(db.get, Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    
+    if job.status != JobStatus.DONE or not job.result_filename:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job has no result to download yet",
+        )
+    
+    # Bulk invoices are zipped on the fly from the PDFs the job recorded
+    if job.kind == INVOICE_JOB_KIND:
+        entries = await read_invoice_manifest(job.result_key)
+        missing = await missing_invoices(entries)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail=f"{len(missing)} invoices changed since the job ran; start a new job",
+            )
+        return StreamingResponse(
+            stream_invoice_archive(entries),
+            media_type=job.result_media_type,
+            headers={"Content-Disposition": content_disposition(job.result_filename, "attachment")},
+        )
+    
+    return content_store.serve(
+        job.result_key,
+        job.result_media_type,
+        job.result_filename,
+        headers={"Cache-Control": "private, no-store"},
+    )
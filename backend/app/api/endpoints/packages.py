@@ -1,26 +1,65 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from ...api.deps import get_db, get_current_active_user, get_current_admin
+from ...core.cache import VersionedResponseCache
+from ...core.config import settings
+from ...core.responses import serialize_list
 from ...models.user import User
 from ...models.package import Package
 from ...schemas.package import Package as PackageSchema, PackageCreate, PackageUpdate
 
 router = APIRouter()
 
+# Largest catalog page; also the default and the only page that is cached
+CATALOG_PAGE_SIZE = 100
+
+# Serialized public catalog pages, invalidated on every package write
+catalog_cache = VersionedResponseCache(max_age=settings.PACKAGES_CACHE_MAX_AGE)
+
+CATALOG_CACHE_CONTROL = (
+    f"public, max-age={settings.PACKAGES_CACHE_MAX_AGE}, "
+    f"stale-while-revalidate={settings.PACKAGES_CACHE_STALE_WHILE_REVALIDATE}"
+)
+
+
+def _catalog_response(body: bytes, etag: str, status_code: int = 200) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(status_code=status_code, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @router.get("/", response_model=List[PackageSchema])
 def read_packages(
+    request: Request,
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = CATALOG_PAGE_SIZE,
 ) -> Any:
     """
-    Retrieve all packages.
+    Retrieve all packages. `limit` is capped at CATALOG_PAGE_SIZE; only the
+    default page is cached, other pages are built for each request.
     """
+    skip = max(skip, 0)
+    limit = min(max(limit, 1), CATALOG_PAGE_SIZE)
+    cacheable = skip == 0 and limit == CATALOG_PAGE_SIZE
+    if_none_match = request.headers.get("if-none-match")
+    cached = catalog_cache.get((skip, limit)) if cacheable else None
+    if cached is not None:
+        body, etag = cached
+        if catalog_cache.etag_matches(if_none_match, etag):
+            return _catalog_response(body, etag, status.HTTP_304_NOT_MODIFIED)
+        return _catalog_response(body, etag)
+
     packages = db.query(Package).filter(Package.is_active == True).offset(skip).limit(limit).all()
-    return packages
+    body = serialize_list(PackageSchema, packages)
+    etag = catalog_cache.set((skip, limit), body) if cacheable else catalog_cache.etag_for(body)
+
+    if catalog_cache.etag_matches(if_none_match, etag):
+        return _catalog_response(body, etag, status.HTTP_304_NOT_MODIFIED)
+    return _catalog_response(body, etag)
 
 
 @router.post("/", response_model=PackageSchema)
@@ -46,6 +85,7 @@ def create_package(
     db.add(package)
     db.commit()
     db.refresh(package)
+    catalog_cache.bump()
     return package
 
 
@@ -106,6 +146,7 @@ def update_package(
     db.add(package)
     db.commit()
     db.refresh(package)
+    catalog_cache.bump()
     return package
 
 
@@ -131,4 +172,5 @@ def delete_package(
     db.add(package)
     db.commit()
     db.refresh(package)
+    catalog_cache.bump()
     return package
\ No newline at end of file
@@ -0,0 +1,112 @@
+from typing import Any
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ...api.deps import get_db, get_current_admin
+from ...core.config import settings
+from ...models.user import User
+from ...schemas.payment import (
+    PaymentNotification,
+    VerificationBatch,
+    VerificationQueuePage,
+    VerificationResult,
+    WebhookAck,
+)
+from ...schemas.reconciliation import ReconciliationReport
+from ...services.payments import (
+    apply_verification_decisions,
+    payment_inbox,
+    save_notification,
+    verification_queue,
+    verify_signature,
+)
+from ...services.reconciliation import read_settlement, reconcile
+
+router = APIRouter()
+
+
+@router.post("/reconcile", response_model=ReconciliationReport)
+def reconcile_settlement(
+    *,
+    db: Session = Depends(get_db),
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Reconcile a bank/e-wallet settlement export (CSV, JSON or JSON Lines)
+    against open bills and mark matched bills paid. Admin only.
+    With dry_run the report is produced without changing any bill.
+    """
+    lines = read_settlement(file.file, file.filename)
+    return reconcile(db, lines, apply=not dry_run)
+
+
+@router.get("/verifications", response_model=VerificationQueuePage)
+def read_verification_queue(
+    *,
+    db: Session = Depends(get_db),
+    after: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Bills with a payment proof awaiting verification, oldest first. Admin only.
+    Pass the returned next_cursor as `after` to get the next page.
+    """
+    return verification_queue(db, after=after, limit=limit)
+
+
+@router.post("/verifications", response_model=VerificationResult)
+def verify_payments(
+    *,
+    db: Session = Depends(get_db),
+    batch: VerificationBatch,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Approve or reject many payment proofs at once, in one transaction. Admin only.
+    """
+    return apply_verification_decisions(db, batch.decisions)
+
+
+@router.post("/webhook", response_model=WebhookAck)
+async def payment_webhook(request: Request, db: Session = Depends(get_db)) -> Any:
+    """
+    Payment notification from the gateway. Acknowledged once it is
+    verified and saved to the payment inbox; bills are updated in the
+    background.
+    """
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment webhook is not configured",
+        )
+    if not payment_inbox.running:
+        # Nothing would apply it; let the gateway retry
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment processing is not running, retry later",
+        )
+    
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Signature")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid signature",
+        )
+    
+    try:
+        notification = PaymentNotification.model_validate_json(body)
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid notification payload",
+        )
+    
+    saved = await run_in_threadpool(save_notification, db, notification)
+    if saved:
+        payment_inbox.notify()
+    return {"status": "accepted" if saved else "duplicate"}
@@ -0,0 +1,82 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from ...api.deps import get_db, get_current_admin
+from ...core.cache import VersionedResponseCache
+from ...core.config import settings
+from ...models.user import User
+from ...schemas.report import AnalyticsReport, ReceivablesReport
+from ...services.analytics import compute_analytics, default_range
+from ...services.billing_summary import aging_summary, monthly_summary, package_summary
+
+router = APIRouter()
+
+PERIOD_PATTERN = r"^\d{4}-\d{2}$"
+
+# Computed analytics per (start, end), recomputed after ANALYTICS_CACHE_SECONDS
+analytics_cache = VersionedResponseCache(max_age=settings.ANALYTICS_CACHE_SECONDS)
+
+
+def _analytics_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if analytics_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/receivables", response_model=ReceivablesReport)
+def read_receivables(
+    *,
+    db: Session = Depends(get_db),
+    start: Optional[str] = Query(None, pattern=PERIOD_PATTERN),
+    end: Optional[str] = Query(None, pattern=PERIOD_PATTERN),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Receivables aging and revenue per month and per package, read from the
+    pre-aggregated summary tables. Admin only.
+    `start` and `end` (YYYY-MM) limit the monthly breakdown.
+    """
+    aging = aging_summary(db)
+    return {
+        "outstanding_count": sum(bucket["bill_count"] for bucket in aging),
+        "outstanding_amount": sum(bucket["total_amount"] for bucket in aging),
+        "aging": aging,
+        "monthly": monthly_summary(db, start, end),
+        "packages": package_summary(db),
+    }
+
+
+@router.get("/analytics", response_model=AnalyticsReport)
+def read_analytics(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    start: Optional[str] = Query(None, pattern=PERIOD_PATTERN),
+    end: Optional[str] = Query(None, pattern=PERIOD_PATTERN),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Monthly MRR, churn, ARPU, days-to-pay and collection rate. Admin only.
+    `start` and `end` (YYYY-MM) default to the last 12 months. Results are
+    computed in the database and reused for ANALYTICS_CACHE_SECONDS.
+    """
+    default_start, default_end = default_range()
+    start, end = start or default_start, end or default_end
+    if_none_match = request.headers.get("if-none-match")
+    cached = analytics_cache.get((start, end))
+    if cached is not None:
+        return _analytics_response(*cached, if_none_match)
+
+    try:
+        report = compute_analytics(db, start, end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    body = report.model_dump_json().encode("utf-8")
+    etag = analytics_cache.set((start, end), body)
+    return _analytics_response(body, etag, if_none_match)
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from ...api.deps import get_db, get_current_active_user, get_current_admin, get_current_admin_or_technician
+from ...core.responses import list_response
 from ...models.user import User
 from ...models.subscription import Subscription, SubscriptionStatus
 from ...schemas.subscription import (
@@ -12,6 +13,7 @@ from ...schemas.subscription import (
     SubscriptionCreate,
     SubscriptionUpdate
 )
+from ...services.subscriptions import change_status
 
 router = APIRouter()
 
@@ -27,7 +29,7 @@ def read_subscriptions(
     Retrieve all subscriptions. Admin only.
     """
     subscriptions = db.query(Subscription).offset(skip).limit(limit).all()
-    return subscriptions
+    return list_response(SubscriptionSchema, subscriptions)
 
 
 @router.get("/me", response_model=List[SubscriptionSchema])
@@ -39,7 +41,7 @@ def read_my_subscriptions(
     Retrieve current user's subscriptions.
     """
     subscriptions = db.query(Subscription).filter(Subscription.user_id == current_user.id).all()
-    return subscriptions
+    return list_response(SubscriptionSchema, subscriptions)
 
 
 @router.post("/", response_model=SubscriptionSchema)
@@ -181,7 +183,7 @@ def update_subscription(
     
     # Update subscription fields if provided in the input
     if subscription_in.status:
-        subscription.status = subscription_in.status
+        change_status(subscription, subscription_in.status)
     if subscription_in.start_date:
         subscription.start_date = subscription_in.start_date
     if subscription_in.end_date:
@@ -222,7 +224,7 @@ def suspend_subscription(
             detail="Subscription not found",
         )
     
-    subscription.status = SubscriptionStatus.SUSPENDED
+    change_status(subscription, SubscriptionStatus.SUSPENDED)
     db.add(subscription)
     db.commit()
     db.refresh(subscription)
@@ -246,7 +248,7 @@ def activate_subscription(
             detail="Subscription not found",
         )
     
-    subscription.status = SubscriptionStatus.ACTIVE
+    change_status(subscription, SubscriptionStatus.ACTIVE)
     if not subscription.start_date:
         subscription.start_date = datetime.now()
     
@@ -280,13 +282,10 @@ def cancel_subscription(
             detail="Not enough permissions",
         )
     
-    subscription.status = SubscriptionStatus.CANCELLED
+    # Service runs until the end of the current billing period, if known
+    change_status(subscription, SubscriptionStatus.CANCELLED, ended_at=subscription.next_payment_date)
     subscription.auto_renew = False
     
-    # Set end date to end of current billing period if not already set
-    if not subscription.end_date and subscription.next_payment_date:
-        subscription.end_date = subscription.next_payment_date
-    
     db.add(subscription)
     db.commit()
     db.refresh(subscription)
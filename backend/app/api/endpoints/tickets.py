@@ -0,0 +1,271 @@
+from typing import List, Any, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, selectinload
+
+from ...api.deps import get_db, get_current_active_user, get_current_admin, get_current_admin_or_technician
+from ...models.user import User
+from ...models.support_ticket import SupportTicket, TicketCategory, TicketPriority, TicketReply, TicketStatus
+from ...schemas.support_ticket import (
+    SupportTicket as SupportTicketSchema,
+    SupportTicketCreate,
+    SupportTicketDetail,
+    SupportTicketUpdate,
+    TicketReply as TicketReplySchema,
+    TicketListPage,
+    TicketReplyIn,
+    TicketSearchResult,
+)
+from ...services.ticket_search import search_tickets
+from ...services.tickets import ticket_page
+
+router = APIRouter()
+
+STAFF_ROLES = ("admin", "technician")
+
+
+def _get_ticket(db: Session, ticket_id: int, current_user: User) -> SupportTicket:
+    ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found",
+        )
+
+    if ticket.user_id != current_user.id and current_user.role not in STAFF_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return ticket
+
+
+def _check_choice(name: str, value: Optional[str], choices) -> None:
+    allowed = [choice.value for choice in choices]
+    if value is not None and value not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} '{value}'; expected one of: {', '.join(allowed)}",
+        )
+
+
+@router.get("/", response_model=TicketListPage)
+def read_tickets(
+    *,
+    db: Session = Depends(get_db),
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    priority: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_admin_or_technician),
+) -> Any:
+    """
+    Ticket inbox: by status, most urgent and most recently active first,
+    with reply counts and customer names. Admin and technician only.
+    Pass the returned next_cursor as `after` to get the next page.
+    """
+    _check_choice("status", ticket_status, TicketStatus)
+    _check_choice("priority", priority, TicketPriority)
+    try:
+        return ticket_page(db, status=ticket_status, priority=priority, after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@router.get("/me", response_model=TicketListPage)
+def read_my_tickets(
+    *,
+    db: Session = Depends(get_db),
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Retrieve current user's tickets, in the same order as the inbox.
+    """
+    _check_choice("status", ticket_status, TicketStatus)
+    try:
+        return ticket_page(db, status=ticket_status, user_id=current_user.id, after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@router.get("/search", response_model=List[TicketSearchResult])
+def search(
+    *,
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Full-text search over ticket titles, descriptions and replies, best
+    match first. Every word must match (as a prefix). Customers only
+    search their own tickets.
+    """
+    _check_choice("status", ticket_status, TicketStatus)
+    user_id = None if current_user.role in STAFF_ROLES else current_user.id
+    try:
+        hits = search_tickets(db, q, user_id=user_id, status=ticket_status, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    tickets = {
+        ticket.id: ticket
+        for ticket in db.query(SupportTicket).filter(SupportTicket.id.in_([hit.ticket_id for hit in hits]))
+    }
+    return [
+        TicketSearchResult(
+            **SupportTicketSchema.model_validate(tickets[hit.ticket_id]).model_dump(),
+            score=hit.score,
+            snippet=hit.snippet,
+        )
+        for hit in hits
+        if hit.ticket_id in tickets
+    ]
+
+
+@router.post("/", response_model=SupportTicketSchema)
+def create_ticket(
+    *,
+    db: Session = Depends(get_db),
+    ticket_in: SupportTicketCreate,
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Open a ticket. Customers can only open tickets for themselves.
+    """
+    if ticket_in.user_id != current_user.id and current_user.role not in STAFF_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+
+    _check_choice("category", ticket_in.category, TicketCategory)
+    _check_choice("priority", ticket_in.priority, TicketPriority)
+
+    ticket = SupportTicket(
+        user_id=ticket_in.user_id,
+        title=ticket_in.title,
+        description=ticket_in.description,
+        category=ticket_in.category,
+        priority=ticket_in.priority,
+        status=TicketStatus.OPEN,
+        attachments=ticket_in.attachments,
+        notes=ticket_in.notes,
+    )
+    db.add(ticket)
+    db.commit()
+    db.refresh(ticket)
+    return ticket
+
+
+@router.get("/{ticket_id}", response_model=SupportTicketDetail)
+def read_ticket(
+    *,
+    db: Session = Depends(get_db),
+    ticket_id: int,
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get a ticket with its customer, technician and replies.
+    """
+    _get_ticket(db, ticket_id, current_user)
+    return (
+        db.query(SupportTicket)
+        .options(
+            selectinload(SupportTicket.user),
+            selectinload(SupportTicket.technician),
+            selectinload(SupportTicket.ticket_replies),
+        )
+        .filter(SupportTicket.id == ticket_id)
+        .populate_existing()
+        .one()
+    )
+
+
+@router.put("/{ticket_id}", response_model=SupportTicketSchema)
+def update_ticket(
+    *,
+    db: Session = Depends(get_db),
+    ticket_id: int,
+    ticket_in: SupportTicketUpdate,
+    current_user: User = Depends(get_current_admin_or_technician),
+) -> Any:
+    """
+    Update, assign, resolve or close a ticket. Admin and technician only.
+    """
+    ticket = _get_ticket(db, ticket_id, current_user)
+    changes = ticket_in.model_dump(exclude_unset=True)
+    _check_choice("status", changes.get("status"), TicketStatus)
+    _check_choice("priority", changes.get("priority"), TicketPriority)
+    _check_choice("category", changes.get("category"), TicketCategory)
+
+    now = datetime.now()
+    if changes.get("technician_id") and changes["technician_id"] != ticket.technician_id:
+        ticket.assigned_at = now
+    if changes.get("status") == TicketStatus.RESOLVED and ticket.status != TicketStatus.RESOLVED:
+        ticket.resolved_at = now
+    if changes.get("status") == TicketStatus.CLOSED and ticket.status != TicketStatus.CLOSED:
+        ticket.closed_at = now
+    for field, value in changes.items():
+        setattr(ticket, field, value)
+
+    db.add(ticket)
+    db.commit()
+    db.refresh(ticket)
+    return ticket
+
+
+@router.delete("/{ticket_id}", response_model=SupportTicketSchema)
+def delete_ticket(
+    *,
+    db: Session = Depends(get_db),
+    ticket_id: int,
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    Delete a ticket and its replies. Admin only.
+    """
+    ticket = _get_ticket(db, ticket_id, current_user)
+    deleted = SupportTicketSchema.model_validate(ticket)
+    db.query(TicketReply).filter(TicketReply.ticket_id == ticket_id).delete(synchronize_session=False)
+    db.delete(ticket)
+    db.commit()
+    return deleted
+
+
+@router.post("/{ticket_id}/replies", response_model=TicketReplySchema)
+def create_reply(
+    *,
+    db: Session = Depends(get_db),
+    ticket_id: int,
+    reply_in: TicketReplyIn,
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Reply to a ticket as its customer, a technician or an admin.
+    """
+    _get_ticket(db, ticket_id, current_user)
+    reply = TicketReply(
+        ticket_id=ticket_id,
+        user_id=current_user.id,
+        message=reply_in.message,
+        attachments=reply_in.attachments,
+    )
+    db.add(reply)
+    db.commit()
+    db.refresh(reply)
+    return reply
@@ -5,6 +5,7 @@ from pydantic import EmailStr
 from sqlalchemy.orm import Session
 
 from ...api.deps import get_db, get_current_active_user, get_current_admin, oauth2_scheme
+from ...core.responses import list_response
 from ...core.security import get_password_hash, verify_password
 from ...models.user import User
 from ...schemas.user import User as UserSchema, UserCreate, UserUpdate
@@ -22,7 +23,7 @@ def read_users(
     Retrieve users. Admin only.
     """
     users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    return list_response(UserSchema, users)
 
 @router.get("/me", response_model=UserSchema)
 def read_user_me(
@@ -1,5 +1,8 @@
-from typing import Any, Optional, Dict
+from collections import OrderedDict
+from typing import Any, Optional, Dict, Tuple
 from datetime import datetime, timedelta
+import hashlib
+import threading
 import time
 from functools import wraps
 
@@ -56,3 +59,77 @@ def cached(
     """Custom cache decorator with default settings"""
     cache_service = CacheService()
     return cache_service.cache(expire=expire or 3600)
+
+
+class VersionedResponseCache:
+    """
+    Bounded in-memory LRU of pre-serialized JSON response bodies.
+
+    Entries are tagged with the cache version at the time they were built;
+    calling ``bump()`` after a write makes every stored body stale at once.
+    Expired and stale entries are dropped whenever a new one is stored, and
+    the least recently used go once there are more than ``max_entries``.
+    ETags are derived from the body itself so they stay identical across
+    worker processes that serve the same content.
+    """
+
+    def __init__(self, max_age: int = 60, max_entries: int = 256):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries: "OrderedDict[Any, Tuple[int, float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bump(self) -> int:
+        """Invalidate all cached bodies"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def _fresh(self, entry: Tuple[int, float, bytes, str], now: float) -> bool:
+        version, built_at, _, _ = entry
+        return version == self.version and now - built_at <= self.max_age
+
+    def get(self, key: Any) -> Optional[Tuple[bytes, str]]:
+        """Return ``(body, etag)`` for a fresh entry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._fresh(entry, time.monotonic()):
+                return None
+            self._entries.move_to_end(key)
+        _, _, body, etag = entry
+        return body, etag
+
+    def set(self, key: Any, body: bytes) -> str:
+        """Store a serialized body and return its strong ETag"""
+        etag = self.etag_for(body)
+        now = time.monotonic()
+        with self._lock:
+            for stale in [k for k, entry in self._entries.items() if not self._fresh(entry, now)]:
+                del self._entries[stale]
+            self._entries[key] = (self.version, now, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        """Strong ETag of a serialized body"""
+        return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Check an If-None-Match header against an ETag"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison is what RFC 9110 prescribes for If-None-Match
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
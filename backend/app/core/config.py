@@ -37,7 +37,89 @@ class Settings(BaseSettings):
         if not v:
             return v
         return v.replace('postgres://', 'postgresql://')
-        
+
+    # HTTP caching
+    PACKAGES_CACHE_MAX_AGE: int = 60  # seconds browsers/CDNs may reuse the catalog
+    PACKAGES_CACHE_STALE_WHILE_REVALIDATE: int = 300
+
+    # Uploads
+    UPLOAD_DIR: str = "uploads"
+    MAX_UPLOAD_SIZE: int = 2 * 1024 * 1024  # 2MB
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    UPLOAD_SNIFF_BYTES: int = 256 * 1024  # header window inspected before storing
+    MAX_IMAGE_PIXELS: int = 40_000_000  # ~40MP, well above any phone camera
+    MAX_IMAGE_DIMENSION: int = 12_000  # px, either side
+    IMAGE_WORKERS: int = 0  # image processing processes, 0 = one per CPU
+    PDF_WORKERS: int = 0  # PDF rendering processes, 0 = one per CPU
+    INVOICE_BATCH_SIZE: int = 50  # invoices loaded and rendered together in bulk runs
+    PROOF_THUMBNAIL_SIZE: int = 320  # px, longest side
+    PROOF_PREVIEW_SIZE: int = 1280
+
+    # Stored files: "local" (under UPLOAD_DIR) or "s3" (any S3-compatible service)
+    STORAGE_BACKEND: str = "local"
+    STORAGE_S3_BUCKET: str = ""
+    STORAGE_S3_PREFIX: str = ""
+    STORAGE_S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    STORAGE_S3_REGION: Optional[str] = None
+    STORAGE_S3_ACCESS_KEY: Optional[str] = None
+    STORAGE_S3_SECRET_KEY: Optional[str] = None
+    STORAGE_URL_EXPIRE_SECONDS: int = 300  # lifetime of presigned download URLs
+    STORAGE_ORPHAN_GRACE_SECONDS: int = 3600  # unreferenced files younger than this may be mid-upload
+    # nginx `internal` location aliased to UPLOAD_DIR/objects, e.g. "/protected-files/"
+    STORAGE_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+
+    # QRIS payments
+    # The merchant's printed (static) QRIS string; when set, its merchant
+    # fields are reused and the QRIS_MERCHANT_* settings below are ignored
+    QRIS_STATIC_PAYLOAD: Optional[str] = None
+    QRIS_MERCHANT_ID: str = "ID1020000000000"  # NMID
+    QRIS_MERCHANT_CRITERIA: str = "UMI"
+    QRIS_MERCHANT_CATEGORY: str = "4816"  # MCC: computer network services
+    QRIS_MERCHANT_NAME: str = "SEKAR NET"
+    QRIS_MERCHANT_CITY: str = "Jakarta"
+    QRIS_POSTAL_CODE: str = "12345"
+    QRIS_VALIDITY_SECONDS: int = 24 * 3600
+    QRIS_IMAGE_CACHE_SIZE: int = 256  # rendered PNGs kept in memory
+    QRIS_BOX_SIZE: int = 10  # px per QR module
+    QRIS_PRERENDER_BATCH_SIZE: int = 50  # images per worker task in bulk pre-rendering
+
+    # Settlement reconciliation
+    RECONCILIATION_BATCH_SIZE: int = 1000  # bills per bulk UPDATE
+    RECONCILIATION_REPORT_LIMIT: int = 1000  # unmatched/ambiguous lines listed per report
+
+    # Payment gateway webhook
+    PAYMENT_WEBHOOK_SECRET: Optional[str] = None  # HMAC-SHA256 key; the webhook is disabled when unset
+    PAYMENT_INBOX_BATCH_SIZE: int = 100  # notifications applied per transaction
+    PAYMENT_INBOX_POLL_INTERVAL: int = 30  # seconds between scans for due retries
+    PAYMENT_INBOX_RETRY_DELAY: int = 30  # seconds before the first retry, doubling after each failure
+    PAYMENT_INBOX_RETRY_MAX_DELAY: int = 3600
+    PAYMENT_INBOX_RETENTION_DAYS: int = 30  # applied notifications (and their event ids) kept this long
+
+    # Data exports
+    EXPORT_FETCH_SIZE: int = 2000  # rows fetched from the server-side cursor at a time
+    EXPORT_XLSX_INLINE_MAX_ROWS: int = 50_000  # larger XLSX exports must run as a job
+
+    # Background jobs
+    JOB_RETENTION_SECONDS: int = 24 * 3600  # finished jobs and their files are deleted after this
+
+    # Business analytics
+    ANALYTICS_CACHE_SECONDS: int = 300  # how long a computed date range is reused
+
+    # Columnar snapshots for offline analysis (python -m app.services.snapshots)
+    SNAPSHOT_DIR: str = "snapshots"
+    SNAPSHOT_BATCH_SIZE: int = 10_000  # rows per cursor fetch and Parquet write
+    SNAPSHOT_COMPRESSION: str = "zstd"
+    SNAPSHOT_LAG_SECONDS: int = 60  # recent changes are left for the next run
+    # Each run re-reads this far back before where the previous one stopped,
+    # for rows stamped early by long transactions that committed late
+    SNAPSHOT_OVERLAP_SECONDS: int = 6 * 3600
+
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE: int = 1000  # bytes
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    ZSTD_LEVEL: int = 3
+
     class Config:
         env_file = ".env"
         case_sensitive = True
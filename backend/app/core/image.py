@@ -2,71 +2,140 @@ import os
 from PIL import Image
 from io import BytesIO
 import asyncio
-from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import aiofiles
 from fastapi import UploadFile
 from .config import settings
 
+FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+# PIL refuses to decode beyond twice this; uploads are checked against it
+# before they get here (see core.validation)
+Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily start the worker pool shared by all image jobs"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS or None)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_variants(
+    content: bytes,
+    max_size: Tuple[int, int],
+    quality: int,
+    format: Optional[str] = None,
+) -> Dict[str, bytes]:
+    """
+    Decode, downscale and encode an image. Runs inside a worker process,
+    so it only takes and returns plain bytes.
+    Returns the encoded WebP and original-format variants.
+    """
+    image = Image.open(BytesIO(content))
+    source_format = image.format
+
+    # Image.open only parses the header; refuse bombs before decoding
+    if image.width * image.height > settings.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image too large to process: {image.width}x{image.height}")
+
+    # JPEG can decode straight to 1/2, 1/4 or 1/8 scale, which is far
+    # cheaper than decoding full resolution and resizing afterwards
+    if source_format == 'JPEG':
+        image.draft('RGB', max_size)
+
+    # Flatten transparency onto white so the image can be saved as JPEG
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    if image.width > max_size[0] or image.height > max_size[1]:
+        image.thumbnail(max_size, Image.LANCZOS)
+
+    output_format = format.upper() if format else source_format
+    if output_format not in FORMATS:
+        output_format = 'JPEG'
+
+    webp = BytesIO()
+    image.save(webp, format='WEBP', quality=quality)
+    variants = {'webp': webp.getvalue()}
+
+    if output_format == 'WEBP':
+        variants['original'] = variants['webp']
+    else:
+        original = BytesIO()
+        image.save(original, format=output_format, quality=quality, optimize=True)
+        variants['original'] = original.getvalue()
+    return variants
+
+
 class ImageOptimizer:
     def __init__(self):
         self.max_width = 1920
         self.max_height = 1080
         self.quality = 85
-        self.formats = ['JPEG', 'PNG', 'WEBP']
+        self.formats = list(FORMATS)
         self.upload_path = settings.UPLOAD_DIR
 
+    async def render(
+        self,
+        content: bytes,
+        max_size: Optional[Tuple[int, int]] = None,
+        quality: Optional[int] = None,
+        format: Optional[str] = None
+    ) -> Dict[str, bytes]:
+        """
+        Run the CPU-bound decode/resize/encode in the process pool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(),
+            render_variants,
+            content,
+            max_size or (self.max_width, self.max_height),
+            quality if quality is not None else self.quality,
+            format,
+        )
+
     async def optimize_image(
         self,
         file: UploadFile,
         max_size: Optional[Tuple[int, int]] = None,
         quality: Optional[int] = None,
         format: Optional[str] = None
-    ) -> str:
+    ) -> Dict[str, str]:
         """
         Optimize and save uploaded image
-        Returns the path to the optimized image
+        Returns the paths to the WebP and original-format images
         """
         content = await file.read()
-        image = Image.open(BytesIO(content))
-
-        # Convert RGBA to RGB if necessary
-        if image.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[-1])
-            image = background
-
-        # Resize if needed
-        max_w = max_size[0] if max_size else self.max_width
-        max_h = max_size[1] if max_size else self.max_height
-        
-        if image.width > max_w or image.height > max_h:
-            image.thumbnail((max_w, max_h), Image.LANCZOS)
-
-        # Prepare output format
-        output_format = format.upper() if format else image.format
-        if output_format not in self.formats:
-            output_format = 'JPEG'
-
-        # Prepare quality
-        save_quality = quality if quality is not None else self.quality
+        variants = await self.render(content, max_size, quality, format)
 
         # Prepare output filename
-        filename = file.filename
-        name, ext = os.path.splitext(filename)
-        webp_filename = f"{name}.webp"
-        original_filename = f"{name}_original{ext}"
-
-        # Save both WebP and original format
-        output = BytesIO()
-        image.save(output, format='WEBP', quality=save_quality)
-        webp_path = os.path.join(self.upload_path, webp_filename)
-        with open(webp_path, 'wb') as f:
-            f.write(output.getvalue())
-
-        output = BytesIO()
-        image.save(output, format=output_format, quality=save_quality)
-        original_path = os.path.join(self.upload_path, original_filename)
-        with open(original_path, 'wb') as f:
-            f.write(output.getvalue())
+        name, ext = os.path.splitext(os.path.basename(file.filename))
+        webp_path = os.path.join(self.upload_path, f"{name}.webp")
+        original_path = os.path.join(self.upload_path, f"{name}_original{ext}")
+
+        async with aiofiles.open(webp_path, 'wb') as f:
+            await f.write(variants['webp'])
+        async with aiofiles.open(original_path, 'wb') as f:
+            await f.write(variants['original'])
 
         return {
             'webp': webp_path,
@@ -75,7 +144,7 @@ class ImageOptimizer:
 
     async def bulk_optimize(self, files: list[UploadFile]) -> list[dict]:
         """
-        Optimize multiple images in parallel
+        Optimize multiple images in parallel across the process pool
         """
         tasks = [self.optimize_image(file) for file in files]
         return await asyncio.gather(*tasks)
@@ -1,20 +1,34 @@
 from fastapi import Request, HTTPException
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 import time
+import zlib
 from collections import defaultdict
 from datetime import datetime
 
+try:
+    import brotli
+except ImportError:  # optional codec, gzip is always available
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional codec, gzip is always available
+    zstandard = None
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(
         self,
         app,
         requests_per_minute: int = 60,
-        admin_requests_per_minute: int = 300
+        admin_requests_per_minute: int = 300,
+        exempt_paths: Tuple[str, ...] = ()
     ):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
         self.admin_requests_per_minute = admin_requests_per_minute
+        self.exempt_paths = tuple(exempt_paths)
         self.window = 60  # 1 minute window
         self.request_history = defaultdict(list)  # Store request timestamps by client IP
 
@@ -24,6 +38,10 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Skip rate limiting for static files and docs
         if request.url.path.startswith(("/static/", "/docs/", "/redoc/")):
             return await call_next(request)
+        
+        # Machine-to-machine endpoints that authenticate every request themselves
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
 
         # Get client IP
         forwarded = request.headers.get("X-Forwarded-For")
@@ -72,3 +90,262 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         response.headers["X-RateLimit-Reset"] = str(now + self.window)
         
         return response
+
+
+# Content types that are already compressed; recompressing them only burns CPU
+INCOMPRESSIBLE_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/octet-stream",
+    "application/vnd.openxmlformats-officedocument",
+)
+
+# Levels used for bodies that are compressed once and then served many times
+MAX_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+
+
+class _Encoder:
+    """Incremental compressor with a uniform interface across codecs"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._obj.flush()
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+    """Set the encoding headers; a strong ETag no longer describes the bytes sent"""
+    headers["Content-Encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    encoder = _Encoder(encoding, level)
+    return encoder.compress(data) + encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Content-type aware response compression.
+
+    Negotiates zstd, brotli or gzip from Accept-Encoding, leaves images,
+    PDFs and other already-compressed payloads untouched, and serves
+    responses for ``precompressed_paths`` from an in-memory cache of
+    every encoding built once at maximum level.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1000,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        precompressed_paths: Tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.supported = [
+            encoding for encoding, available in (
+                ("zstd", zstandard is not None),
+                ("br", brotli is not None),
+                ("gzip", True),
+            ) if available
+        ]
+        self.precompressed_paths = set(precompressed_paths)
+        self._precompressed: Dict[str, Tuple[List[Tuple[bytes, bytes]], Dict[str, bytes]]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = self.choose_encoding(headers.get("accept-encoding", ""))
+
+        if scope["method"] in ("GET", "HEAD") and scope["path"] in self.precompressed_paths:
+            await self.send_precompressed(scope, receive, send, encoding)
+            return
+
+        if encoding is None or "range" in headers:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.levels[encoding], self.minimum_size)
+        await responder(scope, receive, send)
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Pick the best supported encoding; server preference breaks q-value ties"""
+        weights: Dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            token, _, params = item.strip().partition(";")
+            token = token.strip().lower()
+            if not token:
+                continue
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            weights[token] = q
+
+        best, best_q = None, 0.0
+        for encoding in self.supported:
+            q = weights.get(encoding, weights.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def send_precompressed(self, scope, receive, send, encoding: Optional[str]):
+        path = scope["path"]
+        if path not in self._precompressed:
+            captured = await self._capture(scope, receive)
+            if captured is None:
+                # Not cacheable (error, redirect...), serve it normally
+                await self.app(scope, receive, send)
+                return
+            self._precompressed[path] = captured
+
+        raw_headers, variants = self._precompressed[path]
+        if encoding is not None and encoding not in variants:
+            variants[encoding] = compress_bytes(variants["identity"], encoding, MAX_LEVELS[encoding])
+        body = variants[encoding or "identity"]
+
+        response_headers = MutableHeaders(raw=list(raw_headers))
+        response_headers["Content-Length"] = str(len(body))
+        if encoding is not None:
+            mark_encoded(response_headers, encoding)
+        else:
+            response_headers.add_vary_header("Accept-Encoding")
+
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers.raw})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _capture(self, scope, receive):
+        start: Dict = {}
+        chunks: List[bytes] = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        # Always render the full GET body so HEAD requests can be served later
+        await self.app(dict(scope, method="GET"), receive, capture_send)
+        if start.get("status") != 200:
+            return None
+        raw_headers = [
+            (key, value) for key, value in start.get("headers", [])
+            if key.lower() not in (b"content-length", b"content-encoding")
+        ]
+        return raw_headers, {"identity": b"".join(chunks)}
+
+
+class _CompressionResponder:
+    def __init__(self, app, encoding: str, level: int, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+        self.started = False
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or content_type.startswith(INCOMPRESSIBLE_TYPES)
+            )
+            self.start_message = message
+            if self.passthrough:
+                self.started = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            # BaseHTTPMiddleware layers stream every body, so hold the start
+            # until there are minimum_size bytes or the body has ended
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if more_body and self.pending_size < self.minimum_size:
+                return
+            self.started = True
+            body = b"".join(self.pending)
+            self.pending = []
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                self.passthrough = True
+                return
+
+            mark_encoded(headers, self.encoding)
+            self.encoder = _Encoder(self.encoding, self.level)
+            if not more_body:
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            await self.send(self.start_message)
+
+        if more_body:
+            chunk = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from xhtml2pdf import pisa
+
+from .config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+# Templates compiled by every worker as it starts
+TEMPLATES = ("invoice.html",)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def rupiah(value: Optional[float]) -> str:
+    """388500 -> "Rp 388.500" """
+    if value is None:
+        return "-"
+    return "Rp " + f"{value:,.0f}".replace(",", ".")
+
+
+def date_filter(value: Any, fmt: str = "%d/%m/%Y") -> str:
+    return value.strftime(fmt) if value else "-"
+
+
+@lru_cache(maxsize=1)
+def environment() -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+    env.filters["rupiah"] = rupiah
+    env.filters["date"] = date_filter
+    return env
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    return environment().get_template(name)
+
+
+@lru_cache(maxsize=None)
+def template_digest(name: str) -> str:
+    """Hash of a template's source, read once like the compiled template"""
+    env = environment()
+    source, _, _ = env.loader.get_source(env, name)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _compile_templates() -> None:
+    for name in TEMPLATES:
+        get_template(name)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily start the PDF worker pool; each worker compiles the templates once"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS or None,
+            initializer=_compile_templates,
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_pdf(template_name: str, context: Dict[str, Any]) -> bytes:
+    """
+    Render an HTML template to PDF. Runs inside a worker process, so the
+    context must be plain picklable data.
+    """
+    html = get_template(template_name).render(**context)
+    output = BytesIO()
+    result = pisa.CreatePDF(html, dest=output, encoding="utf-8")
+    if result.err:
+        raise ValueError(f"Could not render {template_name} to PDF")
+    return output.getvalue()
+
+
+async def render_pdf_async(template_name: str, context: Dict[str, Any]) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), render_pdf, template_name, context)
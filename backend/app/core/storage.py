@@ -0,0 +1,334 @@
+import glob
+import os
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+import aiofiles.os
+from fastapi import Response, UploadFile
+from fastapi.responses import FileResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .uploads import stream_to_temp
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: Optional[str]) -> bool:
+    """True for content hashes, False for legacy file paths"""
+    return bool(value) and DIGEST_PATTERN.match(value) is not None
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+class StoredBlob(NamedTuple):
+    digest: str
+    size: int
+    created: bool  # False when identical content was already stored
+
+
+class StorageBackend(ABC):
+    """
+    Where stored files live. Keys are ``/``-separated relative names.
+    Implementations must make ``put_file`` atomic: readers either see the
+    whole object or nothing. Blocking I/O never runs on the event loop.
+    """
+
+    @abstractmethod
+    async def put_file(self, key: str, local_path: str) -> None:
+        """Move a fully written local temporary file to ``key``"""
+
+    @abstractmethod
+    async def write(self, key: str, data: bytes) -> None:
+        """Store ``data`` at ``key``, replacing what was there"""
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """The whole content stored at ``key``"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether anything is stored at ``key``"""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        """Delete ``prefix`` and every key that starts with it"""
+
+    @abstractmethod
+    def list_keys(self, prefix: str = "") -> Iterator[Tuple[str, datetime]]:
+        """
+        Every key starting with ``prefix``, with its last modification time
+        (UTC). Blocking: for maintenance tasks, run it in the threadpool.
+        """
+
+    @abstractmethod
+    def serve(self, key: str, media_type: Optional[str], filename: str, headers: Optional[dict] = None) -> Response:
+        """
+        Build a response for an already-authorized download without
+        streaming the bytes through Python where the deployment allows it.
+        """
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files on the local filesystem. Downloads are offloaded to the reverse
+    proxy with X-Accel-Redirect when ``accel_redirect_prefix`` is set
+    (an nginx ``internal`` location aliased to ``root``); otherwise they
+    are served with FileResponse, which uses the server's zero-copy
+    path-send support when available.
+    """
+
+    def __init__(self, root: str, accel_redirect_prefix: Optional[str] = None):
+        self.root = root
+        self.accel_redirect_prefix = accel_redirect_prefix
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    async def put_file(self, key: str, local_path: str) -> None:
+        path = self.path_for(key)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        await aiofiles.os.replace(local_path, path)
+
+    async def write(self, key: str, data: bytes) -> None:
+        path = self.path_for(key)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(data)
+
+    async def read(self, key: str) -> bytes:
+        async with aiofiles.open(self.path_for(key), "rb") as f:
+            return await f.read()
+
+    async def exists(self, key: str) -> bool:
+        return await aiofiles.os.path.exists(self.path_for(key))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await run_in_threadpool(self._delete_prefix, prefix)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        for candidate in glob.glob(glob.escape(self.path_for(prefix)) + "*"):
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                pass
+
+    def list_keys(self, prefix: str = "") -> Iterator[Tuple[str, datetime]]:
+        for directory, _, names in os.walk(self.root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    modified = os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+                yield key, datetime.fromtimestamp(modified, timezone.utc)
+
+    def serve(self, key: str, media_type: Optional[str], filename: str, headers: Optional[dict] = None) -> Response:
+        headers = dict(headers or {})
+        if self.accel_redirect_prefix:
+            headers["X-Accel-Redirect"] = self.accel_redirect_prefix.rstrip("/") + "/" + key
+            headers["Content-Disposition"] = content_disposition(filename)
+            return Response(media_type=media_type, headers=headers)
+        return FileResponse(
+            self.path_for(key),
+            media_type=media_type,
+            filename=filename,
+            content_disposition_type="inline",
+            headers=headers,
+        )
+
+
+class S3Storage(StorageBackend):
+    """
+    Objects in an S3-compatible bucket, shared by every app node.
+    ``endpoint_url`` points the client at a local stand-in such as MinIO
+    for development. Downloads redirect to a short-lived presigned URL,
+    so the bytes never pass through the app.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        url_expire_seconds: int = 300,
+    ):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.url_expire_seconds = url_expire_seconds
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def put_file(self, key: str, local_path: str) -> None:
+        try:
+            await run_in_threadpool(self.client.upload_file, local_path, self.bucket, self.object_key(key))
+        finally:
+            await aiofiles.os.remove(local_path)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await run_in_threadpool(
+            self.client.put_object, Bucket=self.bucket, Key=self.object_key(key), Body=data
+        )
+
+    async def read(self, key: str) -> bytes:
+        def _read():
+            return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))["Body"].read()
+        return await run_in_threadpool(_read)
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await run_in_threadpool(self._delete_prefix, prefix)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects})
+
+    def list_keys(self, prefix: str = "") -> Iterator[Tuple[str, datetime]]:
+        strip = len(self.object_key(""))
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            for item in page.get("Contents", []):
+                yield item["Key"][strip:], item["LastModified"]
+
+    def serve(self, key: str, media_type: Optional[str], filename: str, headers: Optional[dict] = None) -> Response:
+        params = {
+            "Bucket": self.bucket,
+            "Key": self.object_key(key),
+            "ResponseContentDisposition": content_disposition(filename),
+        }
+        if media_type:
+            params["ResponseContentType"] = media_type
+        url = self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.url_expire_seconds)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
+
+
+def get_storage_backend() -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.STORAGE_S3_BUCKET,
+            prefix=settings.STORAGE_S3_PREFIX,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+            region=settings.STORAGE_S3_REGION,
+            access_key=settings.STORAGE_S3_ACCESS_KEY,
+            secret_key=settings.STORAGE_S3_SECRET_KEY,
+            url_expire_seconds=settings.STORAGE_URL_EXPIRE_SECONDS,
+        )
+    return LocalStorage(
+        os.path.join(settings.UPLOAD_DIR, "objects"),
+        accel_redirect_prefix=settings.STORAGE_ACCEL_REDIRECT_PREFIX,
+    )
+
+
+class ContentStore:
+    """
+    Content-addressed file store on top of a StorageBackend.
+
+    Files are named by the SHA-256 of their content and sharded into
+    nested prefix directories (``ab/cd/abcd...``) so no single directory
+    grows large. Identical uploads map to the same object; reference
+    counting lives in the database (see ``services.stored_files``).
+    Derived files such as thumbnails sit next to the original as
+    ``<key><suffix>`` and are removed with it.
+    """
+
+    def __init__(self, backend: StorageBackend, temp_dir: str, shard_levels: int = 2, shard_width: int = 2):
+        self.backend = backend
+        self.temp_dir = temp_dir
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+
+    def ensure_dirs(self) -> None:
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def key_for(self, digest: str) -> str:
+        width = self.shard_width
+        shards = [digest[i * width:(i + 1) * width] for i in range(self.shard_levels)]
+        return "/".join(shards + [digest])
+
+    def variant_key(self, digest: str, suffix: str) -> str:
+        return f"{self.key_for(digest)}{suffix}"
+
+    def digest_for(self, key: str) -> Optional[str]:
+        """The content hash a stored file or variant key belongs to, if any"""
+        digest = key.rsplit("/", 1)[-1][:64]
+        if is_digest(digest) and key.startswith(self.key_for(digest)):
+            return digest
+        return None
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str, datetime]]:
+        """``(digest, key, last modified)`` of every stored file and variant"""
+        for key, modified in self.backend.list_keys():
+            digest = self.digest_for(key)
+            if digest is not None:
+                yield digest, key, modified
+
+    async def save_upload(self, file: UploadFile, max_bytes: Optional[int] = None) -> StoredBlob:
+        """Stream an upload into the store, hashing it on the way in"""
+        # Uploads are staged on local disk, then handed to the backend whole
+        temp_path, size, digest = await stream_to_temp(file, self.temp_dir, max_bytes)
+        key = self.key_for(digest)
+        try:
+            if await self.backend.exists(key):
+                await aiofiles.os.remove(temp_path)
+                return StoredBlob(digest, size, created=False)
+            await self.backend.put_file(key, temp_path)
+        except BaseException:
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+            raise
+        return StoredBlob(digest, size, created=True)
+
+    async def read(self, key: str) -> bytes:
+        return await self.backend.read(key)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await self.backend.write(key, data)
+
+    async def exists(self, key: str) -> bool:
+        return await self.backend.exists(key)
+
+    async def delete(self, digest: str) -> None:
+        """Remove a stored file and all of its variants"""
+        await self.backend.delete_prefix(self.key_for(digest))
+
+    def serve(self, key: str, media_type: Optional[str], filename: str, headers: Optional[dict] = None) -> Response:
+        return self.backend.serve(key, media_type, filename, headers)
+
+
+content_store = ContentStore(get_storage_backend(), os.path.join(settings.UPLOAD_DIR, "tmp"))
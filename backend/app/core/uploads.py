@@ -0,0 +1,64 @@
+import hashlib
+import os
+import secrets
+from typing import Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
+
+from .config import settings
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB",
+    )
+
+
+async def stream_to_temp(
+    file: UploadFile,
+    directory: str,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Tuple[str, int, str]:
+    """
+    Stream an uploaded file into a temporary file inside ``directory``.
+
+    The body is copied in fixed-size chunks and hashed on the way through,
+    so memory per upload stays constant. The size cap is enforced while
+    reading: an oversized upload is aborted as soon as it crosses the
+    limit, whatever the client claimed up front. All disk I/O goes
+    through aiofiles' thread pool so a slow disk never blocks the loop.
+
+    Returns ``(temp_path, size, sha256 hexdigest)``; the caller is
+    responsible for renaming or removing the temporary file.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    # Cheap early rejection when the size is known, not relied upon
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    temp_path = os.path.join(directory, f".upload.{secrets.token_hex(8)}.part")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        if await aiofiles.os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+        raise
+
+    return temp_path, written, digest.hexdigest()
@@ -0,0 +1,149 @@
+import struct
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+
+from .config import settings
+
+# Extension we store for each detected type, regardless of the client's filename
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "application/pdf": ".pdf",
+}
+
+# Content types clients send that mean the same thing
+TYPE_ALIASES = {
+    "image/jpg": "image/jpeg",
+    "image/pjpeg": "image/jpeg",
+    "image/x-png": "image/png",
+}
+
+PROOF_TYPES = ("image/jpeg", "image/png", "image/webp", "application/pdf")
+
+
+class DetectedFile(NamedTuple):
+    content_type: str
+    extension: str
+    dimensions: Optional[Tuple[int, int]]
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """Identify a file from its magic bytes"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
+
+
+def _png_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _jpeg_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    # Walk the marker segments up to the first start-of-frame
+    i = 2
+    length = len(head)
+    while i + 9 < length:
+        if head[i] != 0xFF:
+            return None
+        marker = head[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # standalone markers
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", head[i + 5:i + 9])
+            return width, height
+        if marker in (0xD9, 0xDA):  # end of image / start of scan before any frame
+            return None
+        i += 2 + struct.unpack(">H", head[i + 2:i + 4])[0]
+    return None
+
+
+def _webp_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+DIMENSION_PARSERS = {
+    "image/png": _png_dimensions,
+    "image/jpeg": _jpeg_dimensions,
+    "image/webp": _webp_dimensions,
+}
+
+
+def _reject(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def inspect_head(
+    head: bytes,
+    allowed_types: Sequence[str],
+    claimed_type: Optional[str] = None,
+) -> DetectedFile:
+    """
+    Validate a file from its first bytes only: the real type must be
+    allowed and match what the client claimed, and images must declare
+    dimensions within the configured limits. Nothing is decoded.
+    """
+    content_type = sniff_type(head)
+    if content_type is None or content_type not in allowed_types:
+        raise _reject(f"Invalid file type. Allowed types: {', '.join(allowed_types)}")
+
+    if claimed_type:
+        claimed = claimed_type.split(";")[0].strip().lower()
+        claimed = TYPE_ALIASES.get(claimed, claimed)
+        if claimed != "application/octet-stream" and claimed != content_type:
+            raise _reject("File content does not match its declared type")
+
+    dimensions = None
+    parser = DIMENSION_PARSERS.get(content_type)
+    if parser is not None:
+        dimensions = parser(head)
+        if dimensions is None:
+            raise _reject("Could not read image header")
+        width, height = dimensions
+        if (
+            width == 0 or height == 0
+            or max(width, height) > settings.MAX_IMAGE_DIMENSION
+            or width * height > settings.MAX_IMAGE_PIXELS
+        ):
+            raise _reject(f"Image dimensions {width}x{height} exceed the allowed limit")
+
+    return DetectedFile(content_type, EXTENSIONS[content_type], dimensions)
+
+
+async def validate_upload(
+    file: UploadFile,
+    allowed_types: Sequence[str] = PROOF_TYPES,
+) -> DetectedFile:
+    """
+    Peek at the start of an upload and validate it before it is stored.
+    The upload is rewound afterwards so it can be streamed from the start.
+    """
+    head = await file.read(settings.UPLOAD_SNIFF_BYTES)
+    await file.seek(0)
+    return inspect_head(head, allowed_types, file.content_type)
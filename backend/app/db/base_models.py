@@ -6,3 +6,7 @@ from app.models.subscription import Subscription
 from app.models.bill import Bill
 from app.models.installation_request import InstallationRequest
 from app.models.support_ticket import SupportTicket
+from app.models.stored_file import StoredFile
+from app.models.billing_summary import BillMonthlySummary, BillPackageSummary, ReceivableDueSummary
+from app.models.job import Job
+from app.models.payment_inbox import PaymentInbox
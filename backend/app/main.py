@@ -4,7 +4,6 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 import os
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
@@ -13,7 +12,11 @@ import secure
 from .api.api import api_router
 from .core.config import settings
 from .core.cache import CacheService
-from .core.middleware import RateLimitMiddleware
+from .core.image import shutdown_executor as shutdown_image_executor
+from .core.pdf import shutdown_executor as shutdown_pdf_executor
+from .core.middleware import CompressionMiddleware, RateLimitMiddleware
+from .core.storage import content_store
+from .services.payments import payment_inbox
 
 DOCS_PATH = os.path.join(os.path.dirname(__file__), "docs", "docs.html")
 
@@ -24,6 +27,26 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+@app.on_event("startup")
+def create_upload_dirs():
+    content_store.ensure_dirs()
+
+@app.on_event("startup")
+async def start_payment_inbox():
+    payment_inbox.start()
+
+@app.on_event("shutdown")
+async def stop_payment_inbox():
+    await payment_inbox.stop()
+
+@app.on_event("shutdown")
+def stop_image_workers():
+    shutdown_image_executor()
+
+@app.on_event("shutdown")
+def stop_pdf_workers():
+    shutdown_pdf_executor()
+
 @app.get("/", include_in_schema=False)
 async def root():
     return FileResponse(DOCS_PATH)
@@ -37,20 +60,34 @@ security_headers = secure.Secure()
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         response = await call_next(request)
+        # Keep cache policies set by endpoints (e.g. the public package catalog)
+        cache_control = response.headers.get("Cache-Control")
         security_headers.framework.fastapi(response)
+        if cache_control:
+            response.headers["Cache-Control"] = cache_control
         return response
 
 # Security Middleware
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+    zstd_level=settings.ZSTD_LEVEL,
+    # Static for the lifetime of the process, so compress them only once
+    precompressed_paths=("/", app.openapi_url),
+)
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 
 # Rate Limiting
 app.add_middleware(
     RateLimitMiddleware,
     requests_per_minute=60,  # Default rate limit
-    admin_requests_per_minute=300  # Higher limit for admin
+    admin_requests_per_minute=300,  # Higher limit for admin
+    # Signed gateway callbacks arrive in bursts from a few IPs
+    exempt_paths=(f"{settings.API_V1_STR}/payments/webhook",),
 )
 
 # CORS Configuration
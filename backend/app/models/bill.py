@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, Integer, Float, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Boolean, Column, String, Integer, Float, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -21,10 +21,16 @@ class PaymentMethod(str, enum.Enum):
 
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # Keyset pagination of bills by status (e.g. the verification queue)
+        Index("ix_bills_payment_status_id", "payment_status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Package billed, copied from the subscription so later package changes leave it alone
+    package_id = Column(Integer, ForeignKey("packages.id"), nullable=True)
     
     # Bill details
     amount = Column(Float, nullable=False)
@@ -39,6 +45,8 @@ class Bill(Base):
     payment_method = Column(String, nullable=True)
     payment_date = Column(DateTime, nullable=True)
     payment_proof = Column(String, nullable=True)  # Path to uploaded proof image
+    payment_proof_thumbnail = Column(String, nullable=True)  # Small WebP for review lists
+    payment_proof_preview = Column(String, nullable=True)  # Display-size WebP
     payment_reference = Column(String, nullable=True)  # Reference/transaction number
     
     # Additional info
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Integer, Float, Date
+
+from ..db.base_class import Base
+
+# Pre-aggregated bill totals, kept current by services.billing_summary in
+# the same transaction as every bill write. Rebuild with
+# `python -m app.services.billing_summary` if they ever drift.
+
+
+class BillMonthlySummary(Base):
+    __tablename__ = "bill_monthly_summary"
+
+    period = Column(String(7), primary_key=True)  # YYYY-MM of bill_date
+    payment_status = Column(String, primary_key=True)
+    bill_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+
+
+class BillPackageSummary(Base):
+    __tablename__ = "bill_package_summary"
+
+    package_id = Column(Integer, primary_key=True)
+    payment_status = Column(String, primary_key=True)
+    bill_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+
+
+class ReceivableDueSummary(Base):
+    """Unpaid bills per due date; aging buckets are ranges over this table"""
+    __tablename__ = "receivable_due_summary"
+
+    due_date = Column(Date, primary_key=True)
+    bill_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON
+from sqlalchemy.sql import func
+import enum
+
+from ..db.base_class import Base
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class Job(Base):
+    """A long-running admin task (large export, bulk invoices) and its result"""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)  # random hex, also used in download URLs
+    kind = Column(String, nullable=False)  # e.g. "export"
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    params = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default=JobStatus.PENDING)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+
+    # Result, in the storage backend
+    result_key = Column(String, nullable=True)
+    result_filename = Column(String, nullable=True)
+    result_media_type = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+
+from ..db.base_class import Base
+
+class PaymentInbox(Base):
+    """A gateway notification, saved before it is acknowledged and applied later by the worker"""
+    __tablename__ = "payment_inbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, nullable=False, unique=True)  # gateway redeliveries collide here
+    payload = Column(JSON, nullable=False)  # the validated PaymentNotification
+    received_at = Column(DateTime, server_default=func.now())
+
+    # Delivery to the bills
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # The worker's scan: unprocessed rows that are due
+        Index("ix_payment_inbox_pending", "processed_at", "next_attempt_at"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+
+from ..db.base_class import Base
+
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    # SHA-256 of the content, also the file's name in the content store
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    extension = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, Integer, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Boolean, Column, DDL, String, Integer, DateTime, ForeignKey, Text, Enum, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -17,6 +17,23 @@ class TicketPriority(str, enum.Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+# Sort order of priorities; stored alongside the name so lists can be
+# ordered by urgency from an index
+PRIORITY_RANKS = {
+    TicketPriority.LOW.value: 0,
+    TicketPriority.MEDIUM.value: 1,
+    TicketPriority.HIGH.value: 2,
+    TicketPriority.URGENT.value: 3,
+}
+
+# Sort order of statuses, highest first: work still to do before finished work
+STATUS_RANKS = {
+    TicketStatus.CLOSED.value: 0,
+    TicketStatus.RESOLVED.value: 1,
+    TicketStatus.IN_PROGRESS.value: 2,
+    TicketStatus.OPEN.value: 3,
+}
+
 class TicketCategory(str, enum.Enum):
     TECHNICAL = "technical"
     BILLING = "billing"
@@ -26,6 +43,10 @@ class TicketCategory(str, enum.Enum):
 
 class SupportTicket(Base):
     __tablename__ = "support_tickets"
+    __table_args__ = (
+        # Ticket lists: keyset pagination on (status, priority, last activity)
+        Index("ix_support_tickets_inbox", "status_rank", "priority_rank", "last_activity_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -36,7 +57,9 @@ class SupportTicket(Base):
     description = Column(Text, nullable=False)
     category = Column(String, default=TicketCategory.TECHNICAL)
     status = Column(String, default=TicketStatus.OPEN)
+    status_rank = Column(Integer, nullable=False, default=3, server_default="3")
     priority = Column(String, default=TicketPriority.MEDIUM)
+    priority_rank = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Ticket handling
     opened_at = Column(DateTime, server_default=func.now())
@@ -44,6 +67,11 @@ class SupportTicket(Base):
     resolved_at = Column(DateTime, nullable=True)
     closed_at = Column(DateTime, nullable=True)
     
+    # Reply counters, kept up to date by app.services.tickets
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_reply_at = Column(DateTime, nullable=True)
+    last_activity_at = Column(DateTime, nullable=False, server_default=func.now())  # opened or last reply
+    
     # Resolution details
     resolution = Column(Text, nullable=True)
     
@@ -63,7 +91,7 @@ class TicketReply(Base):
     __tablename__ = "ticket_replies"
 
     id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("support_tickets.id"), nullable=False)
+    ticket_id = Column(Integer, ForeignKey("support_tickets.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Reply details
@@ -76,4 +104,27 @@ class TicketReply(Base):
     
     # Relationships
     ticket = relationship("SupportTicket", back_populates="ticket_replies")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+
+# Full-text index over ticket titles, descriptions and replies, kept up to
+# date by app.services.ticket_search. Not a mapped table: on SQLite it is an
+# FTS5 virtual table keyed by rowid = ticket id.
+TICKET_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS ticket_search USING fts5("
+        "title, description, replies, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS ticket_search ("
+        "ticket_id INTEGER PRIMARY KEY REFERENCES support_tickets (id) ON DELETE CASCADE, "
+        "document TSVECTOR NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_ticket_search_document ON ticket_search USING GIN (document)",
+    ],
+}
+
+for _dialect, _statements in TICKET_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(SupportTicket.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
+event.listen(SupportTicket.__table__, "before_drop", DDL("DROP TABLE IF EXISTS ticket_search"))
@@ -19,7 +19,6 @@ class BillBase(BaseModel):
     payment_status: Optional[str] = "pending"
     payment_method: Optional[str] = None
     payment_date: Optional[datetime] = None
-    payment_proof: Optional[str] = None
     payment_reference: Optional[str] = None
     notes: Optional[str] = None
 
@@ -44,7 +43,6 @@ class BillPaymentUpdate(BaseModel):
     payment_status: str
     payment_method: str
     payment_date: datetime
-    payment_proof: Optional[str] = None
     payment_reference: Optional[str] = None
 
 
@@ -58,6 +56,7 @@ class Bill(BaseModel):
     id: int
     subscription_id: int
     user_id: int
+    package_id: Optional[int] = None
     amount: float
     tax: float
     total_amount: float
@@ -68,6 +67,8 @@ class Bill(BaseModel):
     payment_method: Optional[str] = None
     payment_date: Optional[datetime] = None
     payment_proof: Optional[str] = None
+    payment_proof_thumbnail: Optional[str] = None
+    payment_proof_preview: Optional[str] = None
     payment_reference: Optional[str] = None
     notes: Optional[str] = None
     created_at: datetime
@@ -80,4 +81,9 @@ class Bill(BaseModel):
 # Bill with expanded subscription and user details
 class BillDetail(Bill):
     subscription: Optional[Subscription] = None
-    user: Optional[User] = None
\ No newline at end of file
+    user: Optional[User] = None
+
+# Bulk invoice run for a billing cycle: bills with start <= bill_date < end
+class InvoiceBatchCreate(BaseModel):
+    start: datetime
+    end: datetime
@@ -0,0 +1,11 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+# Background XLSX export; same options as GET /exports/{dataset}.xlsx
+class ExportJobCreate(BaseModel):
+    dataset: str  # bills, users or subscriptions
+    columns: Optional[str] = None  # comma-separated
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
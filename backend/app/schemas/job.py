@@ -0,0 +1,19 @@
+from typing import Any, Dict, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    params: Optional[Dict[str, Any]] = None
+    status: str
+    progress: int
+    total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None  # set once the job is done
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,54 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import AliasChoices, BaseModel, Field
+
+
+# Payment notification sent by the gateway; common field spellings are accepted
+class PaymentNotification(BaseModel):
+    event_id: str = Field(validation_alias=AliasChoices("event_id", "id", "notification_id"))
+    reference: str = Field(validation_alias=AliasChoices("reference", "order_id", "bill_number"))
+    amount: float = Field(validation_alias=AliasChoices("amount", "gross_amount"))
+    status: str = Field(validation_alias=AliasChoices("status", "transaction_status"))
+    transaction_id: Optional[str] = None
+    paid_at: Optional[datetime] = Field(
+        default=None, validation_alias=AliasChoices("paid_at", "settlement_time", "transaction_time")
+    )
+
+
+class WebhookAck(BaseModel):
+    status: str
+
+
+# Bill awaiting proof verification, as listed in the admin queue
+class VerificationQueueItem(BaseModel):
+    id: int
+    user_id: int
+    customer_name: Optional[str] = None
+    total_amount: float
+    payment_method: Optional[str] = None
+    payment_date: Optional[datetime] = None
+    payment_reference: Optional[str] = None
+    proof_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
+
+
+class VerificationQueuePage(BaseModel):
+    items: List[VerificationQueueItem]
+    next_cursor: Optional[int] = None  # pass as `after` to get the next page
+
+
+class VerificationDecision(BaseModel):
+    bill_id: int
+    approve: bool
+    note: Optional[str] = None
+
+
+class VerificationBatch(BaseModel):
+    decisions: List[VerificationDecision] = Field(max_length=1000)
+
+
+class VerificationResult(BaseModel):
+    approved: List[int] = []
+    rejected: List[int] = []
+    skipped: List[int] = []  # unknown bills or bills no longer awaiting verification
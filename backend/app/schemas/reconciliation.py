@@ -0,0 +1,21 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class ReconciliationLine(BaseModel):
+    line: int
+    reference: Optional[str] = None
+    amount: Optional[float] = None
+    reason: str
+    candidate_bill_ids: List[int] = []
+
+
+class ReconciliationReport(BaseModel):
+    total_lines: int = 0
+    matched: int = 0
+    unmatched_count: int = 0
+    ambiguous_count: int = 0
+    applied: bool = False
+    # Capped at RECONCILIATION_REPORT_LIMIT entries each; the counts are exact
+    unmatched: List[ReconciliationLine] = []
+    ambiguous: List[ReconciliationLine] = []
@@ -0,0 +1,62 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class MonthlyStatusTotal(BaseModel):
+    period: str  # YYYY-MM
+    payment_status: str
+    bill_count: int
+    total_amount: float
+
+    class Config:
+        from_attributes = True
+
+
+class PackageStatusTotal(BaseModel):
+    package_id: int
+    payment_status: str
+    bill_count: int
+    total_amount: float
+
+    class Config:
+        from_attributes = True
+
+
+class AgingBucket(BaseModel):
+    bucket: str  # current, 1-30, 31-60, 61-90, 90+ days past due
+    bill_count: int
+    total_amount: float
+
+
+class ReceivablesReport(BaseModel):
+    outstanding_count: int
+    outstanding_amount: float
+    aging: List[AgingBucket]
+    monthly: List[MonthlyStatusTotal]
+    packages: List[PackageStatusTotal]
+
+
+# One month of business KPIs; rates are fractions, None when undefined
+class AnalyticsMonth(BaseModel):
+    period: str  # YYYY-MM
+    mrr: float
+    mrr_change: Optional[float] = None  # vs. the previous month in the range
+    active_subscriptions: int
+    customers: int
+    new_subscriptions: int
+    churned: int
+    churn_rate: Optional[float] = None
+    arpu: Optional[float] = None
+    billed: float
+    collected: float
+    collection_rate: Optional[float] = None
+    avg_days_to_pay: Optional[float] = None
+    collected_to_date: float
+
+
+class AnalyticsReport(BaseModel):
+    start: str
+    end: str
+    generated_at: datetime
+    months: List[AnalyticsMonth]
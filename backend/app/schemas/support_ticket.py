@@ -24,6 +24,12 @@ class TicketReplyUpdate(TicketReplyBase):
     pass
 
 
+# Body of POST /tickets/{id}/replies; ticket and author come from the request
+class TicketReplyIn(BaseModel):
+    message: str
+    attachments: Optional[str] = None
+
+
 class TicketReply(BaseModel):
     id: int
     ticket_id: int
@@ -83,6 +89,9 @@ class SupportTicket(BaseModel):
     category: str
     status: str
     priority: str
+    reply_count: int = 0
+    last_reply_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
     opened_at: datetime
     assigned_at: Optional[datetime] = None
     resolved_at: Optional[datetime] = None
@@ -101,4 +110,31 @@ class SupportTicket(BaseModel):
 class SupportTicketDetail(SupportTicket):
     user: Optional[User] = None
     technician: Optional[User] = None
-    ticket_replies: Optional[List[TicketReply]] = None
\ No newline at end of file
+    ticket_replies: Optional[List[TicketReply]] = None
+
+
+# Row of a ticket list, built from one joined query
+class TicketListItem(BaseModel):
+    id: int
+    user_id: int
+    customer_name: Optional[str] = None
+    technician_id: Optional[int] = None
+    title: str
+    category: str
+    status: str
+    priority: str
+    reply_count: int
+    last_reply_at: Optional[datetime] = None
+    last_activity_at: datetime
+    created_at: datetime
+
+
+class TicketListPage(BaseModel):
+    items: List[TicketListItem]
+    next_cursor: Optional[str] = None  # pass as `after` to get the next page
+
+
+# Search hit: the ticket plus its relevance and a highlighted excerpt
+class TicketSearchResult(SupportTicket):
+    score: float
+    snippet: str  # HTML: escaped ticket text with <mark>ed matches
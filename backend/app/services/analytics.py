@@ -0,0 +1,154 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import DateTime, String, and_, case, column, distinct, func, or_, select, values
+from sqlalchemy.orm import Session
+
+from ..models.bill import Bill, PaymentStatus
+from ..models.package import Package
+from ..models.subscription import Subscription, SubscriptionStatus
+from ..schemas.report import AnalyticsMonth, AnalyticsReport
+
+MAX_MONTHS = 60
+
+
+def month_range(start: str, end: str) -> List[Tuple[str, datetime, datetime]]:
+    """(YYYY-MM, first instant, first instant of next month) for each month in [start, end]"""
+    year, month = map(int, start.split("-"))
+    last = tuple(map(int, end.split("-")))
+    months = []
+    while (year, month) <= last:
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        months.append((f"{year:04d}-{month:02d}", datetime(year, month, 1), datetime(next_year, next_month, 1)))
+        year, month = next_year, next_month
+    return months
+
+
+def default_range(today: Optional[date] = None) -> Tuple[str, str]:
+    """The last 12 months, including the current one"""
+    today = today or date.today()
+    start_year, start_month = (today.year, today.month - 11) if today.month == 12 else (today.year - 1, today.month + 1)
+    return f"{start_year:04d}-{start_month:02d}", f"{today.year:04d}-{today.month:02d}"
+
+
+def _days_between(dialect: str, later, earlier):
+    if dialect == "postgresql":
+        return func.extract("epoch", later - earlier) / 86400.0
+    return func.julianday(later) - func.julianday(earlier)
+
+
+def compute_analytics(db: Session, start: str, end: str) -> AnalyticsReport:
+    """
+    Monthly KPIs for [start, end], computed entirely in SQL:
+
+    - mrr: monthly package price of subscriptions active at month end
+    - churn_rate: subscriptions ended during the month / active at its start
+    - arpu: MRR per active customer
+    - avg_days_to_pay: bill date to payment date, over bills paid that month
+    - collection_rate: paid share of the amount billed that month
+    """
+    months = month_range(start, end)
+    if not months:
+        raise ValueError("start must not be after end")
+    if len(months) > MAX_MONTHS:
+        raise ValueError(f"At most {MAX_MONTHS} months can be analysed at once")
+
+    dialect = db.get_bind().dialect.name
+    calendar = values(
+        column("period", String), column("month_start", DateTime), column("month_end", DateTime),
+        name="months",
+    ).data(months).cte("calendar")
+
+    # Subscription activity per month
+    # change_status keeps end_date set on every ended subscription
+    ended_at = Subscription.end_date
+    active_at_end = and_(
+        Subscription.start_date < calendar.c.month_end,
+        or_(ended_at.is_(None), ended_at >= calendar.c.month_end),
+    )
+    active_at_start = and_(
+        Subscription.start_date < calendar.c.month_start,
+        or_(ended_at.is_(None), ended_at >= calendar.c.month_start),
+    )
+    churned = and_(
+        Subscription.start_date < calendar.c.month_start,
+        ended_at >= calendar.c.month_start,
+        ended_at < calendar.c.month_end,
+    )
+    started = and_(Subscription.start_date >= calendar.c.month_start, Subscription.start_date < calendar.c.month_end)
+    subscriptions = (
+        select(
+            calendar.c.period,
+            func.count(distinct(case((active_at_end, Subscription.user_id)))).label("customers"),
+            func.count(case((active_at_end, Subscription.id))).label("active_subscriptions"),
+            func.coalesce(func.sum(case((active_at_end, Package.price), else_=0.0)), 0.0).label("mrr"),
+            func.count(case((active_at_start, Subscription.id))).label("active_at_start"),
+            func.count(case((churned, Subscription.id))).label("churned"),
+            func.count(case((started, Subscription.id))).label("new_subscriptions"),
+        )
+        .select_from(calendar)
+        .join(Subscription, and_(Subscription.start_date.is_not(None), Subscription.start_date < calendar.c.month_end))
+        .join(Package, Package.id == Subscription.package_id)
+        .where(Subscription.status != SubscriptionStatus.PENDING)
+        .group_by(calendar.c.period)
+        .cte("subscription_months")
+    )
+
+    # Billing and collection per month
+    billed_in_month = and_(
+        Bill.bill_date >= calendar.c.month_start,
+        Bill.bill_date < calendar.c.month_end,
+        Bill.payment_status != PaymentStatus.CANCELLED,
+    )
+    paid_in_month = and_(
+        Bill.payment_status == PaymentStatus.PAID,
+        Bill.payment_date >= calendar.c.month_start,
+        Bill.payment_date < calendar.c.month_end,
+    )
+    days_to_pay = _days_between(dialect, Bill.payment_date, Bill.bill_date)
+    bills = (
+        select(
+            calendar.c.period,
+            func.coalesce(func.sum(case((billed_in_month, Bill.total_amount), else_=0.0)), 0.0).label("billed"),
+            func.coalesce(func.sum(case(
+                (and_(billed_in_month, Bill.payment_status == PaymentStatus.PAID), Bill.total_amount), else_=0.0,
+            )), 0.0).label("billed_and_paid"),
+            func.coalesce(func.sum(case((paid_in_month, Bill.total_amount), else_=0.0)), 0.0).label("collected"),
+            func.avg(case((paid_in_month, days_to_pay))).label("avg_days_to_pay"),
+        )
+        .select_from(calendar)
+        .join(Bill, or_(
+            and_(Bill.bill_date >= calendar.c.month_start, Bill.bill_date < calendar.c.month_end),
+            and_(Bill.payment_date >= calendar.c.month_start, Bill.payment_date < calendar.c.month_end),
+        ))
+        .group_by(calendar.c.period)
+        .cte("bill_months")
+    )
+
+    mrr = func.coalesce(subscriptions.c.mrr, 0.0)
+    previous_mrr = func.lag(mrr).over(order_by=calendar.c.period)
+    statement = (
+        select(
+            calendar.c.period,
+            mrr.label("mrr"),
+            (mrr - previous_mrr).label("mrr_change"),
+            func.coalesce(subscriptions.c.active_subscriptions, 0).label("active_subscriptions"),
+            func.coalesce(subscriptions.c.customers, 0).label("customers"),
+            func.coalesce(subscriptions.c.new_subscriptions, 0).label("new_subscriptions"),
+            func.coalesce(subscriptions.c.churned, 0).label("churned"),
+            (subscriptions.c.churned * 1.0 / func.nullif(subscriptions.c.active_at_start, 0)).label("churn_rate"),
+            (mrr / func.nullif(subscriptions.c.customers, 0)).label("arpu"),
+            func.coalesce(bills.c.billed, 0.0).label("billed"),
+            func.coalesce(bills.c.collected, 0.0).label("collected"),
+            (bills.c.billed_and_paid / func.nullif(bills.c.billed, 0)).label("collection_rate"),
+            bills.c.avg_days_to_pay,
+            # Running totals over the whole range
+            func.sum(func.coalesce(bills.c.collected, 0.0)).over(order_by=calendar.c.period).label("collected_to_date"),
+        )
+        .select_from(calendar)
+        .outerjoin(subscriptions, subscriptions.c.period == calendar.c.period)
+        .outerjoin(bills, bills.c.period == calendar.c.period)
+        .order_by(calendar.c.period)
+    )
+    series = [AnalyticsMonth.model_validate(row._mapping) for row in db.execute(statement)]
+    return AnalyticsReport(start=start, end=end, generated_at=datetime.now(), months=series)
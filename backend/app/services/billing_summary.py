@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..db.session import SessionLocal
+from ..models.bill import Bill, PaymentStatus
+from ..models.billing_summary import BillMonthlySummary, BillPackageSummary, ReceivableDueSummary
+from ..models.subscription import Subscription
+
+# Statuses that still count as money owed
+RECEIVABLE_STATUSES = (PaymentStatus.PENDING, PaymentStatus.PENDING_VERIFICATION, PaymentStatus.OVERDUE)
+_RECEIVABLE_VALUES = {status.value for status in RECEIVABLE_STATUSES}
+
+# Bill attributes the summaries depend on
+TRACKED_ATTRIBUTES = ("payment_status", "total_amount", "bill_date", "due_date", "package_id")
+
+# (label, first day overdue, last day overdue); None = open-ended
+AGING_BUCKETS = (
+    ("current", None, 0),
+    ("1-30", 1, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
+
+
+class BillSnapshot(NamedTuple):
+    """The parts of a bill the summaries are keyed on"""
+    payment_status: str
+    total_amount: float
+    bill_date: Optional[datetime]
+    due_date: Optional[datetime]
+    package_id: Optional[int]
+
+
+def _status_value(status: Any) -> str:
+    return getattr(status, "value", status)
+
+
+class SummaryDeltas:
+    """Net change to each summary row, accumulated before being written"""
+
+    def __init__(self):
+        self.monthly: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.packages: Dict[Tuple[int, str], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.receivables: Dict[date, List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def add(self, bill: BillSnapshot, sign: int = 1) -> None:
+        status = _status_value(bill.payment_status)
+        amount = (bill.total_amount or 0.0) * sign
+        period = (bill.bill_date or datetime.now()).strftime("%Y-%m")
+        for row in (
+            self.monthly[(period, status)],
+            self.packages[(bill.package_id, status)] if bill.package_id is not None else None,
+            self.receivables[bill.due_date.date()] if bill.due_date and status in _RECEIVABLE_VALUES else None,
+        ):
+            if row is not None:
+                row[0] += sign
+                row[1] += amount
+
+    def remove(self, bill: BillSnapshot) -> None:
+        self.add(bill, -1)
+
+    def apply(self, connection: Connection) -> None:
+        """Upsert the net changes; rows that net to zero are not touched"""
+        for table, keys, deltas in (
+            (BillMonthlySummary.__table__, ("period", "payment_status"), self.monthly),
+            (BillPackageSummary.__table__, ("package_id", "payment_status"), self.packages),
+            (ReceivableDueSummary.__table__, ("due_date",), self.receivables),
+        ):
+            for key, (count, amount) in deltas.items():
+                if count == 0 and abs(amount) < 1e-9:
+                    continue
+                key = key if isinstance(key, tuple) else (key,)
+                _upsert_add(connection, table, dict(zip(keys, key)), count, amount)
+
+
+def _upsert_add(connection: Connection, table, key: Dict[str, Any], count: int, amount: float) -> None:
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    statement = dialect_insert(table).values(**key, bill_count=count, total_amount=amount)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            "bill_count": table.c.bill_count + statement.excluded.bill_count,
+            "total_amount": table.c.total_amount + statement.excluded.total_amount,
+        },
+    )
+    connection.execute(statement)
+
+
+def _package_ids(session: Session, subscription_ids: Iterable[int]) -> Dict[int, int]:
+    subscription_ids = {sid for sid in subscription_ids if sid is not None}
+    if not subscription_ids:
+        return {}
+    rows = session.execute(
+        select(Subscription.id, Subscription.package_id).where(Subscription.id.in_(subscription_ids))
+    )
+    return dict(rows.all())
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_packages(session: Session, flush_context, instances) -> None:
+    """Copy the subscription's package onto new bills and bills moved to another subscription"""
+    bills = [obj for obj in session.new if isinstance(obj, Bill) and obj.package_id is None]
+    bills += [
+        obj for obj in session.dirty
+        if isinstance(obj, Bill) and inspect(obj).attrs.subscription_id.history.has_changes()
+    ]
+    if not bills:
+        return
+    with session.no_autoflush:
+        packages = _package_ids(session, (bill.subscription_id for bill in bills))
+    for bill in bills:
+        bill.package_id = packages.get(bill.subscription_id)
+
+
+def _value_before(bill: Bill, name: str) -> Any:
+    history = inspect(bill).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _value_now(bill: Bill, name: str) -> Any:
+    # Read without triggering a load; server defaults are not known yet
+    return inspect(bill).dict.get(name)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _maintain_summaries(session: Session, flush_context) -> None:
+    """Fold every flushed bill insert, update and delete into the summary tables"""
+    before: List[Tuple[Bill, Dict[str, Any]]] = []
+    after: List[Tuple[Bill, Dict[str, Any]]] = []
+
+    for obj in session.new:
+        if isinstance(obj, Bill):
+            after.append((obj, {name: _value_now(obj, name) for name in TRACKED_ATTRIBUTES}))
+    for obj in session.deleted:
+        if isinstance(obj, Bill):
+            before.append((obj, {name: _value_before(obj, name) for name in TRACKED_ATTRIBUTES}))
+    for obj in session.dirty:
+        if not isinstance(obj, Bill):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES):
+            continue
+        before.append((obj, {name: _value_before(obj, name) for name in TRACKED_ATTRIBUTES}))
+        after.append((obj, {name: _value_now(obj, name) for name in TRACKED_ATTRIBUTES}))
+
+    if not before and not after:
+        return
+
+    connection = session.connection()
+
+    def snapshot(values: Dict[str, Any]) -> BillSnapshot:
+        return BillSnapshot(
+            payment_status=values["payment_status"] or PaymentStatus.PENDING,
+            total_amount=values["total_amount"] or 0.0,
+            bill_date=values["bill_date"],
+            due_date=values["due_date"],
+            package_id=values["package_id"],
+        )
+
+    deltas = SummaryDeltas()
+    for _, values in before:
+        deltas.remove(snapshot(values))
+    for _, values in after:
+        deltas.add(snapshot(values))
+    deltas.apply(connection)
+
+
+# Make sure the previous value of tracked attributes is always known, even
+# when a bill is modified without having been loaded first
+for _name in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Bill, _name), "set", lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+def bill_snapshots(
+    connection: Connection,
+    bill_ids: Iterable[int],
+    for_update: bool = False,
+) -> Dict[int, BillSnapshot]:
+    """
+    Current summary keys of bills, for writers that bypass the ORM (bulk
+    UPDATEs). ``for_update`` locks the bills until the transaction ends.
+    """
+    bill_ids = list(bill_ids)
+    snapshots: Dict[int, BillSnapshot] = {}
+    for start in range(0, len(bill_ids), 500):
+        statement = (
+            select(
+                Bill.id,
+                Bill.payment_status,
+                Bill.total_amount,
+                Bill.bill_date,
+                Bill.due_date,
+                Bill.package_id,
+            )
+            .where(Bill.id.in_(bill_ids[start:start + 500]))
+        )
+        if for_update:
+            statement = statement.with_for_update()
+        rows = connection.execute(statement)
+        for bill_id, *values in rows:
+            snapshots[bill_id] = BillSnapshot(*values)
+    return snapshots
+
+
+def _period_expression(dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(Bill.bill_date, "YYYY-MM")
+    return func.strftime("%Y-%m", Bill.bill_date)
+
+
+def rebuild_summaries(db: Session) -> None:
+    """Recompute every summary table from the bills table in one transaction"""
+    connection = db.connection()
+    period = _period_expression(connection.dialect.name)
+
+    for model in (BillMonthlySummary, BillPackageSummary, ReceivableDueSummary):
+        db.execute(delete(model))
+
+    db.execute(insert(BillMonthlySummary).from_select(
+        ["period", "payment_status", "bill_count", "total_amount"],
+        select(period, Bill.payment_status, func.count(), func.coalesce(func.sum(Bill.total_amount), 0.0))
+        .group_by(period, Bill.payment_status),
+    ))
+    db.execute(insert(BillPackageSummary).from_select(
+        ["package_id", "payment_status", "bill_count", "total_amount"],
+        select(Bill.package_id, Bill.payment_status, func.count(), func.coalesce(func.sum(Bill.total_amount), 0.0))
+        .where(Bill.package_id.isnot(None))
+        .group_by(Bill.package_id, Bill.payment_status),
+    ))
+    due_day = func.date(Bill.due_date)
+    db.execute(insert(ReceivableDueSummary).from_select(
+        ["due_date", "bill_count", "total_amount"],
+        select(due_day, func.count(), func.coalesce(func.sum(Bill.total_amount), 0.0))
+        .where(Bill.payment_status.in_(RECEIVABLE_STATUSES))
+        .group_by(due_day),
+    ))
+    db.commit()
+
+
+def monthly_summary(db: Session, start: Optional[str] = None, end: Optional[str] = None) -> List[BillMonthlySummary]:
+    query = db.query(BillMonthlySummary).filter(BillMonthlySummary.bill_count != 0)
+    if start:
+        query = query.filter(BillMonthlySummary.period >= start)
+    if end:
+        query = query.filter(BillMonthlySummary.period <= end)
+    return query.order_by(BillMonthlySummary.period, BillMonthlySummary.payment_status).all()
+
+
+def package_summary(db: Session) -> List[BillPackageSummary]:
+    return (
+        db.query(BillPackageSummary)
+        .filter(BillPackageSummary.bill_count != 0)
+        .order_by(BillPackageSummary.package_id, BillPackageSummary.payment_status)
+        .all()
+    )
+
+
+def aging_summary(db: Session, today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Outstanding receivables bucketed by days past due, from the per-due-date table"""
+    today = today or date.today()
+    whens = []
+    for label, first_day, last_day in AGING_BUCKETS:
+        conditions = []
+        if first_day is not None:
+            conditions.append(ReceivableDueSummary.due_date <= today - timedelta(days=first_day))
+        if last_day is not None:
+            conditions.append(ReceivableDueSummary.due_date >= today - timedelta(days=last_day))
+        whens.append((conditions[0] if len(conditions) == 1 else conditions[0] & conditions[1], label))
+    bucket = case(*whens)
+    rows = (
+        db.query(bucket, func.sum(ReceivableDueSummary.bill_count), func.sum(ReceivableDueSummary.total_amount))
+        .group_by(bucket)
+        .all()
+    )
+    totals = {label: (count or 0, amount or 0.0) for label, count, amount in rows}
+    return [
+        {"bucket": label, "bill_count": totals.get(label, (0, 0.0))[0], "total_amount": totals.get(label, (0, 0.0))[1]}
+        for label, _, _ in AGING_BUCKETS
+    ]
+
+
+if __name__ == "__main__":
+    from ..db import base_models  # noqa: F401  (registers every model)
+
+    session = SessionLocal()
+    try:
+        rebuild_summaries(session)
+        print("Billing summaries rebuilt")
+    finally:
+        session.close()
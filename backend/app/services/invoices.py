@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional
+
+import aiofiles
+import aiofiles.os
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.pdf import render_pdf_async, template_digest
+from ..core.storage import content_store
+from ..db.session import SessionLocal
+from ..models.bill import Bill, PaymentStatus
+from ..models.package import Package
+from ..models.user import User
+from .jobs import JobProgress, JobResult, job_temp_path
+from .qris import bill_number
+
+INVOICE_TEMPLATE = "invoice.html"
+INVOICE_MEDIA_TYPE = "application/pdf"
+INVOICE_JOB_KIND = "invoices"
+ZIP_MEDIA_TYPE = "application/zip"
+
+STATUS_LABELS = {
+    PaymentStatus.PENDING: "BELUM DIBAYAR",
+    PaymentStatus.PENDING_VERIFICATION: "MENUNGGU VERIFIKASI",
+    PaymentStatus.PAID: "LUNAS",
+    PaymentStatus.OVERDUE: "JATUH TEMPO",
+    PaymentStatus.CANCELLED: "DIBATALKAN",
+}
+
+
+class InvoiceSource(NamedTuple):
+    """Where a bill's invoice is cached and what it is rendered from"""
+    bill_id: int
+    key: str
+    context: Dict[str, Any]
+
+
+def invoice_prefix(bill_id: int) -> str:
+    return f"invoices/{bill_id}/"
+
+
+def invoice_key(bill_id: int, context: Dict[str, Any]) -> str:
+    """
+    Cached invoices are keyed by a hash of everything printed on them and
+    of the template, so editing the bill, its customer or its package, or
+    paying the bill, makes the next download render a fresh PDF.
+    """
+    digest = hashlib.sha256(template_digest(INVOICE_TEMPLATE).encode("ascii"))
+    digest.update(json.dumps(context, sort_keys=True, default=str).encode("utf-8"))
+    return f"{invoice_prefix(bill_id)}{digest.hexdigest()[:32]}.pdf"
+
+
+def invoice_filename(bill_id: int) -> str:
+    return f"invoice-{bill_number(bill_id)}.pdf"
+
+
+def invoice_sources(db: Session, bill_ids: Iterable[int]) -> Dict[int, InvoiceSource]:
+    """Cache key and template context of each bill, in one query"""
+    rows = (
+        db.query(Bill, User, Package)
+        .join(User, User.id == Bill.user_id)
+        .outerjoin(Package, Package.id == Bill.package_id)
+        .filter(Bill.id.in_(list(bill_ids)))
+        .all()
+    )
+    sources = {}
+    for bill, user, package in rows:
+        status = bill.payment_status or PaymentStatus.PENDING
+        context = {
+            "company_name": settings.QRIS_MERCHANT_NAME,
+            "company_city": settings.QRIS_MERCHANT_CITY,
+            "bill_number": bill_number(bill.id),
+            "bill_date": bill.bill_date,
+            "due_date": bill.due_date,
+            "description": bill.description or f"Layanan internet periode {bill.bill_date:%m/%Y}",
+            "amount": bill.amount,
+            "tax": bill.tax,
+            "total_amount": bill.total_amount,
+            "paid": status == PaymentStatus.PAID,
+            "status_label": STATUS_LABELS.get(status, str(status).upper()),
+            "payment_date": bill.payment_date,
+            "payment_reference": bill.payment_reference,
+            "notes": bill.notes,
+            "customer_name": user.full_name or user.username,
+            "customer_email": user.email,
+            "customer_phone": user.phone,
+            "customer_address": user.address,
+            "package_name": package.name if package else None,
+            "package_speed": package.speed if package else None,
+        }
+        sources[bill.id] = InvoiceSource(bill.id, invoice_key(bill.id, context), context)
+    return sources
+
+
+# Renders in progress, so concurrent requests for one invoice share a render
+_rendering: Dict[str, "asyncio.Future[str]"] = {}
+
+
+async def ensure_invoice(source: InvoiceSource) -> str:
+    """Return the storage key of the bill's current invoice, rendering it if needed"""
+    if await content_store.exists(source.key):
+        return source.key
+
+    pending = _rendering.get(source.key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _rendering[source.key] = future
+    try:
+        pdf = await render_pdf_async(INVOICE_TEMPLATE, source.context)
+        # Older versions of this bill's invoice are stale now
+        await content_store.backend.delete_prefix(invoice_prefix(source.bill_id))
+        await _store(source.key, pdf)
+        future.set_result(source.key)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # waiters re-raise it; don't warn when there are none
+        raise
+    finally:
+        del _rendering[source.key]
+    return source.key
+
+
+async def _store(key: str, data: bytes) -> None:
+    # Written to a temporary file first so readers never see a partial PDF
+    content_store.ensure_dirs()
+    temp_path = os.path.join(content_store.temp_dir, f"{uuid.uuid4().hex}.pdf")
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(data)
+        await content_store.backend.put_file(key, temp_path)
+    finally:
+        if await aiofiles.os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+
+
+def _count_bills(start: datetime, end: datetime) -> int:
+    db = SessionLocal()
+    try:
+        return (
+            db.query(func.count(Bill.id))
+            .filter(Bill.bill_date >= start, Bill.bill_date < end)
+            .scalar()
+        )
+    finally:
+        db.close()
+
+
+def _load_batch(start: datetime, end: datetime, after: int, limit: int) -> List[InvoiceSource]:
+    db = SessionLocal()
+    try:
+        bill_ids = [
+            bill_id for bill_id, in db.query(Bill.id)
+            .filter(Bill.bill_date >= start, Bill.bill_date < end, Bill.id > after)
+            .order_by(Bill.id)
+            .limit(limit)
+        ]
+        sources = invoice_sources(db, bill_ids)
+        return [sources[bill_id] for bill_id in bill_ids if bill_id in sources]
+    finally:
+        db.close()
+
+
+async def iter_invoice_batches(start: datetime, end: datetime) -> AsyncIterator[List[InvoiceSource]]:
+    """Invoice sources of the bills dated in [start, end), INVOICE_BATCH_SIZE at a time, by id"""
+    after = 0
+    while True:
+        batch = await run_in_threadpool(_load_batch, start, end, after, settings.INVOICE_BATCH_SIZE)
+        if not batch:
+            return
+        yield batch
+        after = batch[-1].bill_id
+
+
+def invoice_archive_filename(start: datetime, end: datetime) -> str:
+    return f"invoices-{start:%Y%m%d}-{end:%Y%m%d}.zip"
+
+
+async def invoice_batch_job(params: Dict[str, Any], progress: JobProgress) -> JobResult:
+    """
+    Job worker: render every invoice of a billing cycle that is not cached
+    yet. Each batch is spread over the PDF worker processes. The result is
+    a manifest of the bills and invoice keys the job produced, which the
+    download zips without looking at the bills again.
+    """
+    start, end = datetime.fromisoformat(params["start"]), datetime.fromisoformat(params["end"])
+    total = await run_in_threadpool(_count_bills, start, end)
+    await run_in_threadpool(progress.set_total, total)
+
+    entries = []
+    async for batch in iter_invoice_batches(start, end):
+        keys = await asyncio.gather(*(ensure_invoice(source) for source in batch))
+        for source, key in zip(batch, keys):
+            entries.append({
+                "bill_id": source.bill_id,
+                "key": key,
+                "name": f"{source.context['bill_number']}.pdf",
+                "bill_date": source.context["bill_date"].isoformat(),
+            })
+        await run_in_threadpool(progress.advance, len(batch))
+
+    manifest_path = job_temp_path(".json")
+    async with aiofiles.open(manifest_path, "w") as f:
+        await f.write(json.dumps({"invoices": entries}))
+    # The stored result is the manifest; the download turns it into the ZIP
+    return JobResult(manifest_path, invoice_archive_filename(start, end), ZIP_MEDIA_TYPE)
+
+
+async def read_invoice_manifest(result_key: str) -> List[Dict[str, Any]]:
+    """The invoices an invoice job produced, in bill id order"""
+    return json.loads(await content_store.read(result_key))["invoices"]
+
+
+async def missing_invoices(entries: List[Dict[str, Any]]) -> List[int]:
+    """
+    Bills whose recorded invoice is gone, because the bill changed after
+    the job ran and its invoice was rendered again.
+    """
+    missing = []
+    size = settings.INVOICE_BATCH_SIZE
+    for start in range(0, len(entries), size):
+        batch = entries[start:start + size]
+        found = await asyncio.gather(*(content_store.exists(entry["key"]) for entry in batch))
+        missing.extend(entry["bill_id"] for entry, exists in zip(batch, found) if not exists)
+    return missing
+
+
+class _ZipSink:
+    """Write-only file for ZipFile that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_invoice_archive(entries: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Stream the invoices listed in an invoice job's manifest as a ZIP, one
+    entry at a time, straight from storage. Only one PDF is held in memory
+    at a time, and the archive itself is never stored anywhere.
+    """
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps this cheap
+    archive = zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED)
+    for entry in entries:
+        info = zipfile.ZipInfo(entry["name"], date_time=datetime.fromisoformat(entry["bill_date"]).timetuple()[:6])
+        archive.writestr(info, await content_store.read(entry["key"]))
+        yield sink.take()
+    archive.close()
+    yield sink.take()
@@ -0,0 +1,167 @@
+import inspect
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.storage import content_store
+from ..db.session import SessionLocal
+from ..models.job import Job, JobStatus
+from ..schemas.job import Job as JobSchema
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes; a job reports far more often than that
+PROGRESS_INTERVAL = 1.0
+
+
+class JobResult(NamedTuple):
+    """
+    A finished job's output file, still on local disk. Without a
+    local_path the download is produced on request instead (see
+    GET /jobs/{id}/download).
+    """
+    local_path: Optional[str]
+    filename: str
+    media_type: str
+
+
+def job_temp_path(suffix: str) -> str:
+    """Local scratch file for a job's output, next to upload temp files"""
+    content_store.ensure_dirs()
+    return os.path.join(content_store.temp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+
+def create_job(db: Session, kind: str, owner_id: int, params: Optional[Dict[str, Any]] = None) -> Job:
+    job = Job(id=uuid.uuid4().hex, kind=kind, owner_id=owner_id, params=params, status=JobStatus.PENDING)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_out(job: Job) -> JobSchema:
+    out = JobSchema.model_validate(job)
+    if job.status == JobStatus.DONE and job.result_filename:
+        out.download_url = f"{settings.API_V1_STR}/jobs/{job.id}/download"
+    return out
+
+
+def _expired_jobs() -> List[Tuple[str, Optional[str]]]:
+    cutoff = datetime.now() - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+    db = SessionLocal()
+    try:
+        return [tuple(row) for row in db.query(Job.id, Job.result_key).filter(Job.created_at < cutoff)]
+    finally:
+        db.close()
+
+
+def _forget_jobs(job_ids: List[str]) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(Job).where(Job.id.in_(job_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def purge_expired_jobs() -> None:
+    """Forget jobs older than JOB_RETENTION_SECONDS and delete their files"""
+    expired = await run_in_threadpool(_expired_jobs)
+    for _, result_key in expired:
+        if result_key:
+            await content_store.backend.delete_prefix(result_key)
+    if expired:
+        await run_in_threadpool(_forget_jobs, [job_id for job_id, _ in expired])
+
+
+def _update_job(job_id: str, **values) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _start_job(job_id: str) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        job.status = JobStatus.RUNNING
+        db.commit()
+        return job.params or {}
+    finally:
+        db.close()
+
+
+class JobProgress:
+    """Progress callback for job workers; writes are throttled to PROGRESS_INTERVAL"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.done = 0
+        self.total: Optional[int] = None
+        self._written = 0.0
+
+    def set_total(self, total: int) -> None:
+        self.total = total
+        _update_job(self.job_id, total=total)
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+        now = time.monotonic()
+        if now - self._written >= PROGRESS_INTERVAL:
+            self._written = now
+            try:
+                _update_job(self.job_id, progress=self.done)
+            except OperationalError:
+                # Progress is advisory; the final count is recorded when the job finishes
+                logger.debug("Skipped progress update for job %s", self.job_id)
+
+
+async def run_job(job_id: str, work: Callable[[Dict[str, Any], JobProgress], Any]) -> None:
+    """
+    Run a job's work function and record the outcome. Plain functions run
+    in the thread pool; coroutine functions are awaited and must keep
+    blocking calls off the event loop themselves.
+    A returned file is moved into the storage backend, where the download
+    endpoint serves it from.
+    """
+    params = await run_in_threadpool(_start_job, job_id)
+    progress = JobProgress(job_id)
+    try:
+        if inspect.iscoroutinefunction(work):
+            result = await work(params, progress)
+        else:
+            result = await run_in_threadpool(work, params, progress)
+        values: Dict[str, Any] = {}
+        if result is not None:
+            values = dict(result_filename=result.filename, result_media_type=result.media_type)
+            if result.local_path is not None:
+                values["result_key"] = f"jobs/{job_id}"
+                await content_store.backend.put_file(values["result_key"], result.local_path)
+        await run_in_threadpool(
+            _update_job, job_id,
+            status=JobStatus.DONE, progress=progress.done, finished_at=datetime.now(), **values,
+        )
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        await run_in_threadpool(
+            _update_job, job_id,
+            status=JobStatus.FAILED, progress=progress.done, error=str(e), finished_at=datetime.now(),
+        )
+
+    # Each run also clears out the jobs that have outlived their retention
+    try:
+        await purge_expired_jobs()
+    except Exception:
+        logger.exception("Failed to purge expired jobs")
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.image import image_optimizer
+from ..core.storage import StoredBlob, content_store
+from ..db.session import SessionLocal
+from ..models.bill import Bill, PaymentStatus
+from .stored_files import acquire_file, purge_file, purge_released_files, release_file
+
+logger = logging.getLogger(__name__)
+
+# Proofs we can render; PDFs and anything else keep only the original
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+THUMBNAIL_SUFFIX = "_thumb.webp"
+PREVIEW_SUFFIX = "_preview.webp"
+
+# Where proofs were saved, under UPLOAD_DIR, before content-addressed storage
+LEGACY_PROOF_DIRS = ("payment_proofs", "payment-proofs")
+
+
+def variant_keys(digest: str) -> Tuple[str, str]:
+    """Store keys of the thumbnail and preview kept next to the original"""
+    return (
+        content_store.variant_key(digest, THUMBNAIL_SUFFIX),
+        content_store.variant_key(digest, PREVIEW_SUFFIX),
+    )
+
+
+def legacy_proof_path(value: str) -> Optional[str]:
+    """
+    Local file of a proof saved as a plain path before content-addressed
+    storage, or None. Only files directly inside the old proof directories
+    are served, whatever else the stored value points at.
+    """
+    directory, name = os.path.split(os.path.normpath(value))
+    directory = os.path.basename(directory)
+    if directory not in LEGACY_PROOF_DIRS or name in ("", os.curdir, os.pardir):
+        return None
+    path = os.path.join(settings.UPLOAD_DIR, directory, name)
+    return path if os.path.isfile(path) else None
+
+
+def has_variants(extension: Optional[str]) -> bool:
+    return (extension or "").lower() in IMAGE_EXTENSIONS
+
+
+def attach_proof(
+    db: Session,
+    bill: Bill,
+    blob: StoredBlob,
+    content_type: Optional[str],
+    extension: Optional[str],
+) -> None:
+    """
+    Point a bill at stored proof content, moving the file reference from
+    any previous proof. Only the content hash is kept on the bill.
+    """
+    previous = bill.payment_proof
+    if previous != blob.digest:
+        acquire_file(db, blob, content_type, extension)
+        release_file(db, previous)
+    bill.payment_proof = blob.digest
+    bill.payment_proof_thumbnail = None
+    bill.payment_proof_preview = None
+
+
+def _commit_proof(
+    db: Session,
+    bill: Bill,
+    blob: StoredBlob,
+    content_type: Optional[str],
+    extension: Optional[str],
+    payment_date: Optional[datetime],
+) -> None:
+    try:
+        attach_proof(db, bill, blob, content_type, extension)
+        bill.payment_status = PaymentStatus.PENDING_VERIFICATION
+        if payment_date is not None:
+            bill.payment_date = payment_date
+        db.add(bill)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    db.refresh(bill)
+
+
+async def record_proof(
+    db: Session,
+    bill: Bill,
+    blob: StoredBlob,
+    content_type: Optional[str],
+    extension: Optional[str],
+    payment_date: Optional[datetime] = None,
+) -> Bill:
+    """
+    Attach an uploaded proof and leave the bill awaiting verification,
+    then delete the proof it replaced if nothing else references it.
+    """
+    try:
+        await run_in_threadpool(_commit_proof, db, bill, blob, content_type, extension, payment_date)
+    except Exception:
+        # Content this upload stored would otherwise stay with no row
+        if blob.created:
+            try:
+                await purge_file(blob.digest)
+            except Exception:
+                logger.exception("Failed to purge stored file %s", blob.digest)
+        raise
+    await purge_released_files(db)
+    return bill
+
+
+async def generate_proof_variants(bill_id: int, digest: str, extension: Optional[str]) -> None:
+    """
+    Background task: render a thumbnail and a WebP display variant of an
+    uploaded payment proof and record them on the bill, so the admin review
+    screen never has to load or decode the original.
+    """
+    if not has_variants(extension):
+        return
+
+    thumbnail_key, preview_key = variant_keys(digest)
+
+    try:
+        # Re-uploads of the same content reuse the variants rendered before
+        if not (await content_store.exists(thumbnail_key) and await content_store.exists(preview_key)):
+            content = await content_store.read(content_store.key_for(digest))
+
+            thumbnail_size = (settings.PROOF_THUMBNAIL_SIZE, settings.PROOF_THUMBNAIL_SIZE)
+            preview_size = (settings.PROOF_PREVIEW_SIZE, settings.PROOF_PREVIEW_SIZE)
+            thumbnail, preview = await asyncio.gather(
+                image_optimizer.render(content, thumbnail_size, quality=70, format="WEBP"),
+                image_optimizer.render(content, preview_size, format="WEBP"),
+            )
+
+            await content_store.write(thumbnail_key, thumbnail["webp"])
+            await content_store.write(preview_key, preview["webp"])
+    except Exception:
+        logger.exception("Failed to render variants for payment proof %s", digest)
+        return
+
+    await run_in_threadpool(_record_variants, bill_id, digest, thumbnail_key, preview_key)
+
+
+def _record_variants(bill_id: int, digest: str, thumbnail_key: str, preview_key: str) -> None:
+    db = SessionLocal()
+    try:
+        bill = db.query(Bill).filter(Bill.id == bill_id).first()
+        # The customer may have uploaded a newer proof in the meantime
+        if bill is None or bill.payment_proof != digest:
+            return
+        bill.payment_proof_thumbnail = thumbnail_key
+        bill.payment_proof_preview = preview_key
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,358 @@
+import asyncio
+import calendar
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.storage import is_digest
+from ..db.session import SessionLocal
+from ..models.bill import Bill, PaymentMethod, PaymentStatus
+from ..models.payment_inbox import PaymentInbox
+from ..models.subscription import Subscription
+from ..models.user import User
+from ..schemas.payment import (
+    PaymentNotification,
+    VerificationDecision,
+    VerificationQueueItem,
+    VerificationQueuePage,
+    VerificationResult,
+)
+from .reconciliation import OPEN_STATUSES, REFERENCE_PATTERN, to_minor_units
+
+logger = logging.getLogger(__name__)
+
+# Bills an admin may approve: proof submitted (or being submitted) but not yet paid
+VERIFIABLE_STATUSES = (PaymentStatus.PENDING, PaymentStatus.PENDING_VERIFICATION)
+
+SUCCESS_STATUSES = {"paid", "success", "settlement", "capture", "completed"}
+
+CYCLE_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Same day ``months`` later, clamped to the end of shorter months"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def mark_bill_paid(
+    bill: Bill,
+    paid_at: datetime,
+    method: Optional[str] = None,
+    reference: Optional[str] = None,
+) -> None:
+    """
+    Mark a bill paid and move its subscription's billing dates forward
+    by one billing cycle.
+    """
+    bill.payment_status = PaymentStatus.PAID
+    bill.payment_date = paid_at
+    if method:
+        bill.payment_method = method
+    if reference:
+        bill.payment_reference = reference
+
+    subscription: Optional[Subscription] = bill.subscription
+    if subscription is not None:
+        subscription.last_payment_date = paid_at
+        months = CYCLE_MONTHS.get(subscription.billing_cycle or "monthly", 1)
+        subscription.next_payment_date = add_months(subscription.next_payment_date or paid_at, months)
+
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """HMAC-SHA256 of the raw request body, hex encoded"""
+    if not settings.PAYMENT_WEBHOOK_SECRET or not signature:
+        return False
+    expected = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def apply_notifications(db: Session, notifications: Sequence[PaymentNotification]) -> int:
+    """
+    Mark the bills paid by a batch of successful notifications, in one
+    transaction. Safe to repeat: bills that are no longer open are skipped.
+    Returns the number of bills marked paid.
+    """
+    by_bill: Dict[int, PaymentNotification] = {}
+    for notification in notifications:
+        if notification.status.lower() not in SUCCESS_STATUSES:
+            continue
+        found = REFERENCE_PATTERN.search(notification.reference)
+        if found is None:
+            logger.warning("Payment event %s has no bill reference: %r", notification.event_id, notification.reference)
+            continue
+        by_bill.setdefault(int(found.group(1)), notification)
+    if not by_bill:
+        return 0
+
+    bills = (
+        db.query(Bill)
+        .options(joinedload(Bill.subscription))
+        .filter(Bill.id.in_(by_bill), Bill.payment_status.in_(OPEN_STATUSES))
+        .all()
+    )
+    paid = 0
+    for bill in bills:
+        notification = by_bill[bill.id]
+        if to_minor_units(notification.amount) != to_minor_units(bill.total_amount):
+            logger.warning(
+                "Payment event %s amount %s does not match bill %s total %s",
+                notification.event_id, notification.amount, bill.id, bill.total_amount,
+            )
+            continue
+        paid_at = notification.paid_at.replace(tzinfo=None) if notification.paid_at else datetime.now()
+        mark_bill_paid(
+            bill,
+            paid_at,
+            PaymentMethod.ONLINE_PAYMENT,
+            notification.transaction_id or notification.event_id,
+        )
+        paid += 1
+    db.commit()
+    return paid
+
+
+def verification_queue(db: Session, after: int = 0, limit: int = 50) -> VerificationQueuePage:
+    """
+    Bills awaiting proof verification, oldest first. Keyset-paginated on
+    (payment_status, id) so every page is one index range scan.
+    """
+    rows = (
+        db.query(
+            Bill.id,
+            Bill.user_id,
+            User.full_name,
+            Bill.total_amount,
+            Bill.payment_method,
+            Bill.payment_date,
+            Bill.payment_reference,
+            Bill.payment_proof,
+            Bill.payment_proof_thumbnail,
+            Bill.payment_proof_preview,
+        )
+        .join(User, User.id == Bill.user_id)
+        .filter(Bill.payment_status == PaymentStatus.PENDING_VERIFICATION, Bill.id > after)
+        .order_by(Bill.id)
+        .limit(limit + 1)
+        .all()
+    )
+    items = []
+    for row in rows[:limit]:
+        proof_url = f"{settings.API_V1_STR}/bills/{row.id}/payment-proof"
+        if is_digest(row.payment_proof):
+            # Pinned to the proof's hash, so the browser can keep the images
+            proof_url += f"?v={row.payment_proof}"
+        items.append(VerificationQueueItem(
+            id=row.id,
+            user_id=row.user_id,
+            customer_name=row.full_name,
+            total_amount=row.total_amount,
+            payment_method=row.payment_method,
+            payment_date=row.payment_date,
+            payment_reference=row.payment_reference,
+            proof_url=proof_url if row.payment_proof else None,
+            # Variants only exist for content-addressed proofs
+            thumbnail_url=f"{proof_url}&variant=thumbnail" if row.payment_proof_thumbnail else None,
+            preview_url=f"{proof_url}&variant=preview" if row.payment_proof_preview else None,
+        ))
+    next_cursor = items[-1].id if len(rows) > limit else None
+    return VerificationQueuePage(items=items, next_cursor=next_cursor)
+
+
+def apply_verification_decisions(db: Session, decisions: Sequence[VerificationDecision]) -> VerificationResult:
+    """
+    Approve or reject many bills in one transaction. Approved bills are
+    marked paid; rejected ones go back to pending so the customer can
+    upload a new proof. Bills no longer awaiting verification are skipped.
+    """
+    by_bill = {decision.bill_id: decision for decision in decisions}
+    result = VerificationResult()
+    if not by_bill:
+        return result
+
+    bills = (
+        db.query(Bill)
+        .options(joinedload(Bill.subscription))
+        .filter(Bill.id.in_(by_bill), Bill.payment_status.in_(VERIFIABLE_STATUSES))
+        .all()
+    )
+    now = datetime.now()
+    for bill in bills:
+        decision = by_bill[bill.id]
+        if decision.approve:
+            mark_bill_paid(bill, bill.payment_date or now)
+            result.approved.append(bill.id)
+        else:
+            bill.payment_status = PaymentStatus.PENDING
+            if decision.note:
+                bill.notes = decision.note
+            result.rejected.append(bill.id)
+    db.commit()
+
+    handled = {bill.id for bill in bills}
+    result.skipped = sorted(bill_id for bill_id in by_bill if bill_id not in handled)
+    return result
+
+
+def save_notification(db: Session, notification: PaymentNotification) -> bool:
+    """
+    Put a notification in the payment inbox, in its own transaction.
+    Returns False when the event id is already there (a redelivery).
+    """
+    db.add(PaymentInbox(
+        event_id=notification.event_id,
+        payload=notification.model_dump(mode="json"),
+        next_attempt_at=datetime.now(),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    delay = settings.PAYMENT_INBOX_RETRY_DELAY * 2 ** min(attempts - 1, 16)
+    return timedelta(seconds=min(delay, settings.PAYMENT_INBOX_RETRY_MAX_DELAY))
+
+
+def _apply_entries(db: Session, entries: Sequence[PaymentInbox]) -> None:
+    """Apply inbox entries and mark them processed, in one transaction"""
+    now = datetime.now()
+    for entry in entries:
+        entry.processed_at = now
+    apply_notifications(db, [PaymentNotification.model_validate(entry.payload) for entry in entries])
+    db.commit()  # apply_notifications does not commit when no bill was open
+
+
+def drain_inbox(limit: int) -> int:
+    """
+    Apply up to ``limit`` due inbox entries, oldest first. A failing batch
+    is retried one entry at a time, so one bad event does not hold back
+    the rest; entries that still fail are retried later with backoff.
+    Returns how many entries were handled.
+    """
+    db = SessionLocal()
+    try:
+        entries = (
+            db.query(PaymentInbox)
+            .filter(PaymentInbox.processed_at.is_(None), PaymentInbox.next_attempt_at <= datetime.now())
+            .order_by(PaymentInbox.next_attempt_at, PaymentInbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not entries:
+            return 0
+        try:
+            _apply_entries(db, entries)
+            return len(entries)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to apply %d payment notifications, retrying one by one", len(entries))
+
+        for entry_id in [entry.id for entry in entries]:
+            entry = db.get(PaymentInbox, entry_id, with_for_update={"skip_locked": True})
+            if entry is None or entry.processed_at is not None:
+                continue
+            try:
+                _apply_entries(db, [entry])
+            except Exception as exc:
+                db.rollback()
+                logger.exception("Failed to apply payment event %s", entry.event_id)
+                entry = db.get(PaymentInbox, entry_id)
+                entry.attempts += 1
+                entry.next_attempt_at = datetime.now() + _retry_delay(entry.attempts)
+                entry.last_error = repr(exc)[:1000]
+                db.commit()
+        return len(entries)
+    finally:
+        db.close()
+
+
+def prune_inbox() -> int:
+    """Delete applied inbox entries older than PAYMENT_INBOX_RETENTION_DAYS"""
+    cutoff = datetime.now() - timedelta(days=settings.PAYMENT_INBOX_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        deleted = (
+            db.query(PaymentInbox)
+            .filter(PaymentInbox.processed_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+class PaymentInboxWorker:
+    """
+    Applies the notifications the webhook saved to the payment inbox, in
+    batches, from a background task. The webhook wakes it after each new
+    entry; it also scans every PAYMENT_INBOX_POLL_INTERVAL seconds, which
+    picks up retries and entries left behind by a crash or restart.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker; entries not yet applied stay in the inbox"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def notify(self) -> None:
+        """Wake the worker for a newly saved entry"""
+        if self._worker is None:
+            raise RuntimeError("Payment inbox worker is not running; call start() first")
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        last_prune = 0.0
+        while True:
+            self._wakeup.clear()
+            try:
+                while await run_in_threadpool(drain_inbox, self.batch_size) == self.batch_size:
+                    pass
+                if time.monotonic() - last_prune > 3600:
+                    await run_in_threadpool(prune_inbox)
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("Failed to drain the payment inbox")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+payment_inbox = PaymentInboxWorker(settings.PAYMENT_INBOX_BATCH_SIZE, settings.PAYMENT_INBOX_POLL_INTERVAL)
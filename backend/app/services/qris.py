@@ -0,0 +1,317 @@
+import asyncio
+import binascii
+import logging
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.image import get_executor
+from ..db.session import SessionLocal
+from ..models.bill import Bill, PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+QRIS_CACHE_DIR = os.path.join(settings.UPLOAD_DIR, "qris")
+
+# EMVCo merchant-presented mode tags used here
+TAG_FORMAT = "00"
+TAG_INITIATION = "01"
+TAG_MERCHANT_ACCOUNT = "51"
+TAG_CATEGORY = "52"
+TAG_CURRENCY = "53"
+TAG_AMOUNT = "54"
+TAG_COUNTRY = "58"
+TAG_MERCHANT_NAME = "59"
+TAG_MERCHANT_CITY = "60"
+TAG_POSTAL_CODE = "61"
+TAG_ADDITIONAL_DATA = "62"
+TAG_CRC = "63"
+
+INITIATION_STATIC = "11"
+INITIATION_DYNAMIC = "12"
+
+# Sub-tags of the additional data field (62)
+ADDITIONAL_BILL_NUMBER = "01"
+ADDITIONAL_REFERENCE = "05"
+
+
+def tlv(tag: str, value: str) -> str:
+    if len(value) > 99:
+        raise ValueError(f"QRIS field {tag} is longer than 99 characters")
+    return f"{tag}{len(value):02d}{value}"
+
+
+def parse_tlv(payload: str) -> Dict[str, str]:
+    """Split a payload into its top-level fields, keeping their order"""
+    fields: Dict[str, str] = {}
+    i = 0
+    while i < len(payload):
+        tag, length = payload[i:i + 2], int(payload[i + 2:i + 4])
+        fields[tag] = payload[i + 4:i + 4 + length]
+        i += 4 + length
+    return fields
+
+
+def crc16(data: str) -> str:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) as required by EMVCo"""
+    return f"{binascii.crc_hqx(data.encode('utf-8'), 0xFFFF):04X}"
+
+
+def format_amount(amount: float) -> str:
+    # Rupiah amounts are whole numbers; keep cents only when there are any
+    if float(amount).is_integer():
+        return str(int(amount))
+    return f"{amount:.2f}"
+
+
+def bill_number(bill_id: int) -> str:
+    return f"BILL-{bill_id:06d}"
+
+
+def bill_reference(bill_id: int, window: int) -> str:
+    """Reference label carried in the payload and echoed back by the acquirer"""
+    return f"REF-{bill_id}-{window}"
+
+
+@lru_cache()
+def merchant_fields() -> Dict[str, str]:
+    """
+    The merchant part of every payload. Taken from the merchant's printed
+    (static) QRIS when QRIS_STATIC_PAYLOAD is set, otherwise built from
+    the QRIS_* settings.
+    """
+    if settings.QRIS_STATIC_PAYLOAD:
+        fields = parse_tlv(settings.QRIS_STATIC_PAYLOAD.strip())
+        for tag in (TAG_AMOUNT, TAG_ADDITIONAL_DATA, TAG_CRC):
+            fields.pop(tag, None)
+        return fields
+    return {
+        TAG_FORMAT: "01",
+        TAG_MERCHANT_ACCOUNT: (
+            tlv("00", "ID.CO.QRIS.WWW")
+            + tlv("02", settings.QRIS_MERCHANT_ID)
+            + tlv("03", settings.QRIS_MERCHANT_CRITERIA)
+        ),
+        TAG_CATEGORY: settings.QRIS_MERCHANT_CATEGORY,
+        TAG_CURRENCY: "360",  # IDR
+        TAG_COUNTRY: "ID",
+        TAG_MERCHANT_NAME: settings.QRIS_MERCHANT_NAME[:25],
+        TAG_MERCHANT_CITY: settings.QRIS_MERCHANT_CITY[:15],
+        TAG_POSTAL_CODE: settings.QRIS_POSTAL_CODE,
+    }
+
+
+def build_payload(bill_id: int, amount: float, window: int) -> str:
+    """Dynamic (single-use) QRIS payload for one bill, amount included"""
+    fields = dict(merchant_fields())
+    fields[TAG_INITIATION] = INITIATION_DYNAMIC
+    fields[TAG_AMOUNT] = format_amount(amount)
+    fields[TAG_ADDITIONAL_DATA] = (
+        tlv(ADDITIONAL_BILL_NUMBER, bill_number(bill_id))
+        + tlv(ADDITIONAL_REFERENCE, bill_reference(bill_id, window))
+    )
+    body = "".join(tlv(tag, fields[tag]) for tag in sorted(fields)) + TAG_CRC + "04"
+    return body + crc16(body)
+
+
+class QrisCode(NamedTuple):
+    bill_id: int
+    amount: str
+    window: int
+    payload: str
+    valid_until: datetime
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.bill_id}-{self.amount}-{self.window}"
+
+
+def current_window(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now()
+    return int(now.timestamp()) // settings.QRIS_VALIDITY_SECONDS
+
+
+def qris_for_bill(bill_id: int, total_amount: float, window: Optional[int] = None) -> QrisCode:
+    """
+    The QRIS code of a bill for a validity window. Codes are stable within
+    a window, so they can be cached by (bill id, amount, window).
+    """
+    if window is None:
+        window = current_window()
+    valid_until = datetime.fromtimestamp((window + 1) * settings.QRIS_VALIDITY_SECONDS)
+    return QrisCode(
+        bill_id=bill_id,
+        amount=format_amount(total_amount),
+        window=window,
+        payload=build_payload(bill_id, total_amount, window),
+        valid_until=valid_until,
+    )
+
+
+def render_png(payload: str, box_size: int = 10) -> bytes:
+    """Encode a payload as a PNG QR code. Plain bytes in and out, so it can run in a worker process."""
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECT_M, box_size=box_size, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    output = BytesIO()
+    qr.make_image().save(output, format="PNG")
+    return output.getvalue()
+
+
+def render_many(payloads: Sequence[str], box_size: int = 10) -> List[bytes]:
+    """Render a batch in one worker call to keep inter-process overhead low"""
+    return [render_png(payload, box_size) for payload in payloads]
+
+
+class QrisImageCache:
+    """
+    Rendered QRIS images: a bounded in-memory LRU in front of a directory
+    of PNG files. Entries are keyed by (bill id, amount, validity window),
+    so a changed amount or a new window simply misses and old entries
+    age out of the LRU or get purged from disk.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, code: QrisCode) -> str:
+        return os.path.join(self.directory, f"{code.cache_key}.png")
+
+    def _remember(self, key: str, png: bytes) -> None:
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, code: QrisCode) -> Optional[bytes]:
+        with self._lock:
+            png = self._memory.get(code.cache_key)
+            if png is not None:
+                self._memory.move_to_end(code.cache_key)
+                return png
+        try:
+            with open(self.path_for(code), "rb") as f:
+                png = f.read()
+        except FileNotFoundError:
+            return None
+        self._remember(code.cache_key, png)
+        return png
+
+    def has(self, code: QrisCode) -> bool:
+        return code.cache_key in self._memory or os.path.exists(self.path_for(code))
+
+    def put(self, code: QrisCode, png: bytes, remember: bool = True) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(code)
+        # Write then rename so readers never see a partial image
+        temp_path = f"{path}.{secrets.token_hex(4)}.part"
+        with open(temp_path, "wb") as f:
+            f.write(png)
+        os.replace(temp_path, path)
+        if remember:
+            self._remember(code.cache_key, png)
+
+    def get_or_render(self, code: QrisCode) -> bytes:
+        png = self.get(code)
+        if png is None:
+            png = render_png(code.payload, settings.QRIS_BOX_SIZE)
+            self.put(code, png)
+        return png
+
+    def purge_expired(self, window: Optional[int] = None) -> int:
+        """Delete images from validity windows before ``window`` (default: the current one)"""
+        if window is None:
+            window = current_window()
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != ".png":
+                continue
+            try:
+                entry_window = int(stem.rsplit("-", 1)[1])
+            except (IndexError, ValueError):
+                continue
+            if entry_window < window:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+qris_images = QrisImageCache(QRIS_CACHE_DIR, settings.QRIS_IMAGE_CACHE_SIZE)
+
+
+UNPAID_STATUSES = (PaymentStatus.PENDING, PaymentStatus.OVERDUE)
+
+
+def _unrendered_bill_codes(since: Optional[datetime], window: int) -> List[QrisCode]:
+    # Runs in the threadpool: one query plus a file check per unpaid bill
+    db = SessionLocal()
+    try:
+        query = db.query(Bill.id, Bill.total_amount).filter(Bill.payment_status.in_(UNPAID_STATUSES))
+        if since is not None:
+            query = query.filter(Bill.created_at >= since)
+        codes = [qris_for_bill(bill_id, amount, window) for bill_id, amount in query.order_by(Bill.id)]
+    finally:
+        db.close()
+    return [code for code in codes if not qris_images.has(code)]
+
+
+def _store_rendered(codes: Sequence[QrisCode], pngs: Sequence[bytes]) -> None:
+    # Straight to disk: a whole billing cycle would only churn the LRU
+    for code, png in zip(codes, pngs):
+        qris_images.put(code, png, remember=False)
+
+
+async def prerender_unpaid_bills(since: Optional[datetime] = None) -> int:
+    """
+    Background job: render the current window's QRIS image for every unpaid
+    bill (created since ``since``, when given) in the image process pool and
+    write them to the image cache, so the customer-facing download after a
+    billing run is a cache hit. Returns the number of images rendered.
+    """
+    window = current_window()
+    await run_in_threadpool(qris_images.purge_expired, window)
+
+    codes = await run_in_threadpool(_unrendered_bill_codes, since, window)
+    if not codes:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    size = settings.QRIS_PRERENDER_BATCH_SIZE
+    batches = [codes[i:i + size] for i in range(0, len(codes), size)]
+
+    async def render_batch(batch: List[QrisCode]) -> None:
+        pngs = await loop.run_in_executor(
+            executor, render_many, [code.payload for code in batch], settings.QRIS_BOX_SIZE
+        )
+        await run_in_threadpool(_store_rendered, batch, pngs)
+
+    try:
+        await asyncio.gather(*(render_batch(batch) for batch in batches))
+    except Exception:
+        logger.exception("QRIS pre-render failed")
+        raise
+    logger.info("Pre-rendered %d QRIS images for window %d", len(codes), window)
+    return len(codes)
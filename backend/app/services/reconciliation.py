@@ -0,0 +1,377 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.bill import Bill, PaymentMethod, PaymentStatus
+from ..models.subscription import Subscription
+from ..schemas.reconciliation import ReconciliationLine, ReconciliationReport
+from .billing_summary import SummaryDeltas, bill_snapshots
+
+OPEN_STATUSES = (PaymentStatus.PENDING, PaymentStatus.PENDING_VERIFICATION, PaymentStatus.OVERDUE)
+
+# Bill number (BILL-000123) or QRIS reference label (REF-123-<window>)
+REFERENCE_PATTERN = re.compile(r"(?:BILL-0*|REF-)(\d+)", re.IGNORECASE)
+
+# Settlement export column names we understand, by field
+COLUMN_ALIASES = {
+    "reference": ("reference", "ref", "bill_number", "remark", "description", "keterangan", "berita"),
+    "amount": ("amount", "nominal", "total", "jumlah", "credit"),
+    "transaction_id": ("transaction_id", "trx_id", "rrn", "id"),
+    "paid_at": ("paid_at", "settlement_date", "transaction_time", "date", "tanggal"),
+}
+
+DATE_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y")
+
+
+class SettlementLine(NamedTuple):
+    line: int
+    reference: Optional[str]
+    amount: Optional[int]  # minor units (sen), so amounts hash exactly
+    transaction_id: Optional[str]
+    paid_at: Any  # as exported; only parsed for matched lines
+
+
+def to_minor_units(amount: float) -> int:
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1)))
+
+
+def parse_amount(raw: Any) -> Optional[int]:
+    """Parse "150000", "150.000", "150,000.00", "Rp 150.000,00" and friends"""
+    if isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        try:
+            return to_minor_units(raw)
+        except InvalidOperation:  # NaN and Infinity
+            return None
+    if not isinstance(raw, str):  # missing, or a JSON object/array
+        return None
+    return _parse_amount_text(raw)
+
+
+@lru_cache(maxsize=65536)
+def _parse_amount_text(raw: str) -> Optional[int]:
+    text = raw.strip().replace("Rp", "").replace("IDR", "").replace(" ", "")
+    if not text:
+        return None
+    # The last separator is the decimal point only if it has 1-2 digits after it
+    last = max(text.rfind("."), text.rfind(","))
+    if last != -1 and len(text) - last - 1 in (1, 2):
+        whole, fraction = text[:last], text[last + 1:]
+    else:
+        whole, fraction = text, ""
+    whole = whole.replace(".", "").replace(",", "")
+    try:
+        return to_minor_units(Decimal(f"{whole}.{fraction or '0'}"))
+    except InvalidOperation:
+        return None
+
+
+def parse_timestamp(raw: Any) -> Optional[datetime]:
+    if not raw or not isinstance(raw, str):
+        return None
+    return _parse_timestamp_text(raw)
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp_text(raw: str) -> Optional[datetime]:
+    text = raw.strip()
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize(name: str) -> str:
+    return name.strip().lower().replace(" ", "_")
+
+
+def _column_positions(header: List[str]) -> Dict[str, int]:
+    names = [_normalize(name) for name in header]
+    positions = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                positions[field] = names.index(alias)
+                break
+    return positions
+
+
+def iter_csv(stream: BinaryIO) -> Iterator[SettlementLine]:
+    """Read a CSV export row by row; ``,`` or ``;`` separated, with a header"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    header_line = text.readline()
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = next(csv.reader([header_line], delimiter=delimiter), [])
+    positions = _column_positions(header)
+
+    reference_at = positions.get("reference")
+    amount_at = positions.get("amount")
+    transaction_at = positions.get("transaction_id")
+    paid_at_at = positions.get("paid_at")
+
+    def cell(row: List[str], index: Optional[int]) -> Optional[str]:
+        return row[index] if index is not None and index < len(row) else None
+
+    try:
+        for number, row in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+            if not row:
+                continue
+            yield SettlementLine(
+                line=number,
+                reference=cell(row, reference_at),
+                amount=parse_amount(cell(row, amount_at)),
+                transaction_id=cell(row, transaction_at),
+                paid_at=cell(row, paid_at_at),
+            )
+    finally:
+        text.detach()
+
+
+def _iter_json_values(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Decode JSON Lines or a top-level JSON array one object at a time,
+    without holding the whole document in memory.
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    buffer = ""
+    started = False
+    try:
+        while True:
+            chunk = text.read(chunk_size)
+            buffer += chunk
+            position = 0
+            while True:
+                # Skip whitespace and array punctuation between values
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if not started and position < len(buffer) and buffer[position] == "[":
+                    started = True
+                    position += 1
+                    continue
+                if position < len(buffer) and buffer[position] == "]":
+                    position += 1
+                    continue
+                if position >= len(buffer):
+                    break
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # incomplete value; read more
+                started = True
+                yield value
+                position = end
+            buffer = buffer[position:]
+            if not chunk:
+                return
+    finally:
+        text.detach()
+
+
+def _field(record: Dict[str, Any], field: str) -> Any:
+    for alias in COLUMN_ALIASES[field]:
+        if alias in record:
+            return record[alias]
+    return None
+
+
+def _text(value: Any) -> Optional[str]:
+    """JSON scalars as text; null, objects and arrays as missing"""
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+def iter_json(stream: BinaryIO) -> Iterator[SettlementLine]:
+    for number, record in enumerate(_iter_json_values(stream), start=1):
+        if not isinstance(record, dict):
+            continue
+        record = {_normalize(key): value for key, value in record.items()}
+        yield SettlementLine(
+            line=number,
+            reference=_text(_field(record, "reference")),
+            amount=parse_amount(_field(record, "amount")),
+            transaction_id=_text(_field(record, "transaction_id")),
+            paid_at=_field(record, "paid_at"),
+        )
+
+
+def read_settlement(stream: BinaryIO, filename: Optional[str]) -> Iterator[SettlementLine]:
+    if (filename or "").lower().endswith((".json", ".jsonl", ".ndjson")):
+        return iter_json(stream)
+    return iter_csv(stream)
+
+
+class OpenBillIndex:
+    """
+    Hash index of the bills a settlement may pay: bill id -> amount for
+    reference matching, and amount -> bill ids to suggest candidates for
+    lines without a usable reference.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, float]]):
+        self.amount_by_bill: Dict[int, int] = {}
+        self.bills_by_amount: Dict[int, List[int]] = {}
+        for bill_id, total_amount in rows:
+            amount = to_minor_units(total_amount)
+            self.amount_by_bill[bill_id] = amount
+            self.bills_by_amount.setdefault(amount, []).append(bill_id)
+
+    @classmethod
+    def load(cls, db: Session) -> "OpenBillIndex":
+        rows = db.query(Bill.id, Bill.total_amount).filter(Bill.payment_status.in_(OPEN_STATUSES))
+        return cls(rows.yield_per(5000))
+
+
+def reconcile(
+    db: Session,
+    lines: Iterable[SettlementLine],
+    apply: bool = True,
+    index: Optional[OpenBillIndex] = None,
+) -> ReconciliationReport:
+    """
+    Match settlement lines to open bills and mark the matched bills paid.
+
+    A line matches when its reference names an open bill and the amounts
+    are equal. Lines naming no bill, a closed bill or a different amount
+    are unmatched; lines without a reference and lines paying a bill that
+    an earlier line already paid are ambiguous and left for an admin.
+    Bills are updated with bulk UPDATEs after the whole file is read.
+    """
+    if index is None:
+        index = OpenBillIndex.load(db)
+    report = ReconciliationReport()
+    limit = settings.RECONCILIATION_REPORT_LIMIT
+    matched: Dict[int, SettlementLine] = {}
+
+    def flag(entries: List[ReconciliationLine], line: SettlementLine, reason: str, candidates=()) -> None:
+        if len(entries) < limit:
+            entries.append(ReconciliationLine(
+                line=line.line,
+                reference=line.reference,
+                amount=line.amount / 100 if line.amount is not None else None,
+                reason=reason,
+                candidate_bill_ids=list(candidates)[:10],
+            ))
+
+    for line in lines:
+        report.total_lines += 1
+        if line.amount is None:
+            report.unmatched_count += 1
+            flag(report.unmatched, line, "Missing or unreadable amount")
+            continue
+
+        found = REFERENCE_PATTERN.search(line.reference or "")
+        if found is None:
+            candidates = index.bills_by_amount.get(line.amount, ())
+            if candidates:
+                report.ambiguous_count += 1
+                flag(report.ambiguous, line, "No bill reference; amount matches open bills", candidates)
+            else:
+                report.unmatched_count += 1
+                flag(report.unmatched, line, "No bill reference")
+            continue
+
+        bill_id = int(found.group(1))
+        expected = index.amount_by_bill.get(bill_id)
+        if expected is None:
+            report.unmatched_count += 1
+            flag(report.unmatched, line, "No open bill with this reference")
+        elif expected != line.amount:
+            report.unmatched_count += 1
+            flag(report.unmatched, line, f"Amount differs from bill total {expected / 100:g}", [bill_id])
+        elif bill_id in matched:
+            report.ambiguous_count += 1
+            flag(report.ambiguous, line, f"Bill already paid by line {matched[bill_id].line}", [bill_id])
+        else:
+            matched[bill_id] = line
+
+    report.matched = len(matched)
+    if apply and matched:
+        report.matched = _mark_paid(db, matched)
+        report.applied = True
+    return report
+
+
+def _mark_paid(db: Session, matched: Dict[int, SettlementLine]) -> int:
+    """
+    Mark the matched bills paid and move their subscriptions' billing
+    dates forward, as mark_bill_paid does. Bills paid since the index
+    was loaded are left alone; returns how many bills were marked paid.
+    """
+    from .payments import CYCLE_MONTHS, add_months  # payments imports this module
+
+    now = datetime.now()
+    paid_at = {bill_id: parse_timestamp(line.paid_at) or now for bill_id, line in matched.items()}
+    references = {bill_id: line.transaction_id or line.reference for bill_id, line in matched.items()}
+
+    # Lock the bills first so the snapshots still hold when the UPDATE runs
+    snapshots = bill_snapshots(db.connection(), matched, for_update=True)
+    applied: List[int] = []
+    bill_ids = list(matched)
+    size = settings.RECONCILIATION_BATCH_SIZE
+    for start in range(0, len(bill_ids), size):
+        batch = bill_ids[start:start + size]
+        statement = (
+            update(Bill)
+            .where(Bill.id.in_(batch), Bill.payment_status.in_(OPEN_STATUSES))
+            .values(
+                payment_status=PaymentStatus.PAID,
+                payment_method=PaymentMethod.ONLINE_PAYMENT,
+                payment_date=case({bill_id: paid_at[bill_id] for bill_id in batch}, value=Bill.id),
+                payment_reference=case({bill_id: references[bill_id] for bill_id in batch}, value=Bill.id),
+            )
+            .returning(Bill.id)
+            .execution_options(synchronize_session=False)
+        )
+        applied.extend(db.execute(statement).scalars())
+
+    # The bulk UPDATEs bypass the flush hook, so move the summary rows here
+    deltas = SummaryDeltas()
+    for bill_id in applied:
+        snapshot = snapshots[bill_id]
+        deltas.remove(snapshot)
+        deltas.add(snapshot._replace(payment_status=PaymentStatus.PAID))
+    deltas.apply(db.connection())
+
+    # One billing cycle per paid bill, latest payment wins
+    subscriptions: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(applied), size):
+        rows = db.execute(
+            select(Bill.id, Subscription.id, Subscription.billing_cycle, Subscription.next_payment_date)
+            .join(Subscription, Subscription.id == Bill.subscription_id)
+            .where(Bill.id.in_(applied[start:start + size]))
+            .order_by(Bill.id)
+        )
+        for bill_id, subscription_id, billing_cycle, next_payment_date in rows:
+            months = CYCLE_MONTHS.get(billing_cycle or "monthly", 1)
+            entry = subscriptions.setdefault(subscription_id, {
+                "id": subscription_id,
+                "last_payment_date": None,
+                "next_payment_date": next_payment_date,
+            })
+            entry["next_payment_date"] = add_months(entry["next_payment_date"] or paid_at[bill_id], months)
+            if entry["last_payment_date"] is None or paid_at[bill_id] > entry["last_payment_date"]:
+                entry["last_payment_date"] = paid_at[bill_id]
+    if subscriptions:
+        db.execute(update(Subscription).execution_options(synchronize_session=None), list(subscriptions.values()))
+    db.commit()
+    return len(applied)
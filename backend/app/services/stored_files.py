@@ -0,0 +1,223 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Set
+
+from fastapi import Request, Response, status
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.cache import VersionedResponseCache
+from ..core.config import settings
+from ..core.storage import StoredBlob, content_store, is_digest
+from ..db.session import SessionLocal
+from ..models.stored_file import StoredFile
+
+logger = logging.getLogger(__name__)
+
+_PURGE_KEY = "purge_digests"
+_SWEEP_BATCH_SIZE = 500
+
+
+def acquire_file(
+    db: Session,
+    blob: StoredBlob,
+    content_type: Optional[str] = None,
+    extension: Optional[str] = None,
+) -> None:
+    """Add a reference to stored content, registering it on first use"""
+    incremented = db.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == blob.digest)
+        .values(ref_count=StoredFile.ref_count + 1)
+    ).rowcount
+    if incremented:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(StoredFile(
+                sha256=blob.digest,
+                size=blob.size,
+                content_type=content_type,
+                extension=(extension or "").lower() or None,
+                ref_count=1,
+            ))
+    except IntegrityError:
+        # A concurrent upload of the same content registered it first
+        db.execute(
+            update(StoredFile)
+            .where(StoredFile.sha256 == blob.digest)
+            .values(ref_count=StoredFile.ref_count + 1)
+        )
+
+
+def release_file(db: Session, digest: Optional[str]) -> None:
+    """
+    Drop a reference to stored content. Unreferenced content is deleted
+    from storage by ``purge_released_files`` once the transaction has
+    committed, unless it has been referenced again by then.
+    """
+    if not is_digest(digest):
+        return
+    db.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == digest)
+        .values(ref_count=StoredFile.ref_count - 1)
+    )
+    stored = db.get(StoredFile, digest, populate_existing=True)
+    if stored is not None and stored.ref_count <= 0:
+        # The row stays until the purge, so a concurrent upload of the same
+        # content finds it and increments it instead of registering anew
+        db.info.setdefault(_PURGE_KEY, set()).add(digest)
+
+
+def _lock_unreferenced(db: Session, digest: str) -> bool:
+    deleted = db.execute(
+        delete(StoredFile)
+        .where(StoredFile.sha256 == digest, StoredFile.ref_count <= 0)
+    ).rowcount
+    return bool(deleted) or db.get(StoredFile, digest) is None
+
+
+async def purge_file(digest: str) -> bool:
+    """
+    Delete stored content, and its row, if nothing references it.
+
+    The reference count is re-checked by the DELETE itself, which locks
+    the row: content referenced again since it was released is kept.
+    Content without any row (an upload whose database step failed) is
+    deleted too. Files are removed before the row deletion commits, so
+    a failure leaves the row for ``sweep_unreferenced_files`` to retry.
+    Returns True if the content was deleted.
+    """
+    db = SessionLocal()
+    try:
+        if not await run_in_threadpool(_lock_unreferenced, db, digest):
+            return False
+        await content_store.delete(digest)
+        await run_in_threadpool(db.commit)
+        return True
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def purge_released_files(db: Session) -> None:
+    """
+    Delete the content released by the session's committed changes. Call
+    it after the commit; content it misses is left to the sweep.
+    """
+    for digest in sorted(db.info.pop(_PURGE_KEY, ())):
+        try:
+            await purge_file(digest)
+        except Exception:
+            logger.exception("Failed to purge stored file %s", digest)
+
+
+def _unreferenced_digests(db: Session) -> Set[str]:
+    digests = set(db.scalars(select(StoredFile.sha256).where(StoredFile.ref_count <= 0)))
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.STORAGE_ORPHAN_GRACE_SECONDS)
+    last_modified: Dict[str, datetime] = {}
+    for digest, _, modified in content_store.iter_blobs():
+        last_modified[digest] = max(modified, last_modified.get(digest, modified))
+    candidates = sorted(digest for digest, modified in last_modified.items() if modified < cutoff)
+    for start in range(0, len(candidates), _SWEEP_BATCH_SIZE):
+        batch = candidates[start:start + _SWEEP_BATCH_SIZE]
+        registered = set(db.scalars(select(StoredFile.sha256).where(StoredFile.sha256.in_(batch))))
+        digests.update(digest for digest in batch if digest not in registered)
+    return digests
+
+
+async def sweep_unreferenced_files(db: Session) -> int:
+    """
+    Delete stored content nothing references: released content whose
+    purge did not run or failed, and files without a row (left behind by
+    failed uploads or crashes) once they are older than
+    STORAGE_ORPHAN_GRACE_SECONDS, so uploads still in flight are spared.
+    Returns the number of files deleted.
+    """
+    purged = 0
+    for digest in sorted(await run_in_threadpool(_unreferenced_digests, db)):
+        try:
+            purged += await purge_file(digest)
+        except Exception:
+            logger.exception("Failed to purge stored file %s", digest)
+    return purged
+
+
+def get_stored_file(db: Session, digest: str) -> Optional[StoredFile]:
+    return db.get(StoredFile, digest)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return VersionedResponseCache.etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def stored_file_response(
+    request: Request,
+    stored: StoredFile,
+    key: str,
+    filename: str,
+    media_type: Optional[str] = None,
+    etag_suffix: str = "",
+    immutable: bool = False,
+) -> Response:
+    """
+    Serve stored content to an already-authorized caller.
+
+    Content never changes under a hash, so the hash is a strong ETag and
+    repeat views are answered with 304 without touching storage. Range
+    requests are honoured by the backend (FileResponse, nginx or S3).
+
+    A URL that can start serving other content (a bill's proof, replaced
+    on re-upload) must be revalidated on every use; only pass
+    ``immutable`` when the URL itself names this content.
+    """
+    etag = f'"{stored.sha256}{etag_suffix}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    last_modified = None
+    if immutable:
+        headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        # Deduplicated content can be older than what the URL served before,
+        # so modification dates only validate URLs pinned to one hash
+        if stored.created_at:
+            last_modified = stored.created_at.replace(tzinfo=timezone.utc)
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return content_store.serve(key, media_type or stored.content_type, filename, headers)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_released_files(session: Session) -> None:
+    session.info.pop(_PURGE_KEY, None)
+
+
+if __name__ == "__main__":
+    from ..db import base_models  # noqa: F401  (registers every model)
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        logger.info("Deleted %d unreferenced stored files", asyncio.run(sweep_unreferenced_files(session)))
+    finally:
+        session.close()
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from ..models.subscription import Subscription, SubscriptionStatus
+
+# Subscriptions in these states have ended, as of their end_date
+ENDED_STATUSES = (SubscriptionStatus.CANCELLED, SubscriptionStatus.INACTIVE)
+
+
+def change_status(subscription: Subscription, status: str, ended_at: Optional[datetime] = None) -> None:
+    """
+    Set a subscription's status and keep end_date in step, so churn is
+    dated by when the service ended rather than by some later edit.
+    Ending it sets end_date to ``ended_at`` (default now) unless an earlier
+    end is already set; reopening an ended one clears an end that has passed.
+    """
+    now = datetime.now()
+    if status in ENDED_STATUSES:
+        ended_at = ended_at or now
+        if subscription.end_date is None or subscription.end_date > ended_at:
+            subscription.end_date = ended_at
+    elif subscription.status in ENDED_STATUSES and subscription.end_date is not None and subscription.end_date <= now:
+        subscription.end_date = None
+    subscription.status = status
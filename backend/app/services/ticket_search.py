@@ -0,0 +1,209 @@
+import html
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..db.session import SessionLocal
+from ..models.support_ticket import TICKET_SEARCH_DDL, SupportTicket, TicketReply
+
+# Ticket attributes the index is built from
+INDEXED_ATTRIBUTES = ("title", "description")
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+# The database marks matches with these control characters; the text is
+# HTML-escaped before they become SNIPPET_START/SNIPPET_END
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+SNIPPET_WORDS = 16
+MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# A match in the title weighs most, then the description, then the replies
+_SQLITE_WEIGHTS = "10.0, 4.0, 1.0"
+
+_INDEX_SQL = {
+    "sqlite": {
+        "delete": "DELETE FROM ticket_search WHERE rowid IN :ids",
+        "insert": (
+            "INSERT INTO ticket_search (rowid, title, description, replies) "
+            "SELECT t.id, t.title, t.description, "
+            "(SELECT group_concat(r.message, char(10)) FROM ticket_replies r WHERE r.ticket_id = t.id) "
+            "FROM support_tickets t"
+        ),
+    },
+    "postgresql": {
+        "delete": "DELETE FROM ticket_search WHERE ticket_id IN :ids",
+        "insert": (
+            "INSERT INTO ticket_search (ticket_id, document) "
+            "SELECT t.id, "
+            "setweight(to_tsvector('simple', coalesce(t.title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(t.description, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce("
+            "(SELECT string_agg(r.message, ' ') FROM ticket_replies r WHERE r.ticket_id = t.id), '')), 'C') "
+            "FROM support_tickets t"
+        ),
+    },
+}
+
+
+class TicketHit(NamedTuple):
+    ticket_id: int
+    score: float  # higher is more relevant
+    snippet: str
+
+
+def snippet_html(raw: Optional[str]) -> str:
+    """Escape a snippet's ticket text, then mark its matches"""
+    escaped = html.escape(raw or "")
+    return escaped.replace(_MATCH_START, SNIPPET_START).replace(_MATCH_END, SNIPPET_END)
+
+
+def search_terms(query: str) -> List[str]:
+    """Words of a free-text query; operators and punctuation are dropped"""
+    return [term.lower() for term in _TERM.findall(query)][:MAX_TERMS]
+
+
+def _statements(dialect: str) -> Dict[str, str]:
+    if dialect not in _INDEX_SQL:
+        raise ValueError(f"Ticket search is not supported on {dialect}")
+    return _INDEX_SQL[dialect]
+
+
+def reindex_tickets(connection: Connection, ticket_ids: Iterable[int]) -> None:
+    """Rebuild the index entries of some tickets; deleted tickets drop out"""
+    ticket_ids = sorted({ticket_id for ticket_id in ticket_ids if ticket_id is not None})
+    if not ticket_ids:
+        return
+    statements = _statements(connection.dialect.name)
+    ids = bindparam("ids", expanding=True)
+    connection.execute(text(statements["delete"]).bindparams(ids), {"ids": ticket_ids})
+    connection.execute(
+        text(statements["insert"] + " WHERE t.id IN :ids").bindparams(ids), {"ids": ticket_ids}
+    )
+
+
+def rebuild_search_index(db: Session) -> None:
+    """Create the index if it is missing and refill it from every ticket"""
+    connection = db.connection()
+    dialect = connection.dialect.name
+    statements = _statements(dialect)
+    for statement in TICKET_SEARCH_DDL[dialect]:
+        connection.execute(text(statement))
+    connection.execute(text("DELETE FROM ticket_search"))
+    connection.execute(text(statements["insert"]))
+    if dialect == "sqlite":
+        connection.execute(text("INSERT INTO ticket_search (ticket_search) VALUES ('optimize')"))
+    db.commit()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _maintain_search_index(session: Session, flush_context) -> None:
+    """Re-index every ticket whose text, or one of whose replies, was flushed"""
+    ticket_ids = set()
+    for obj in session.new:
+        if isinstance(obj, SupportTicket):
+            ticket_ids.add(obj.id)
+        elif isinstance(obj, TicketReply):
+            ticket_ids.add(obj.ticket_id)
+    for obj in session.deleted:
+        if isinstance(obj, SupportTicket):
+            ticket_ids.add(obj.id)
+        elif isinstance(obj, TicketReply):
+            ticket_ids.add(obj.ticket_id)
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, SupportTicket):
+            if any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES):
+                ticket_ids.add(obj.id)
+        elif isinstance(obj, TicketReply):
+            if state.attrs.message.history.has_changes() or state.attrs.ticket_id.history.has_changes():
+                ticket_ids.add(obj.ticket_id)
+                ticket_ids.update(state.attrs.ticket_id.history.deleted)
+    reindex_tickets(session.connection(), ticket_ids)
+
+
+def search_tickets(
+    db: Session,
+    query: str,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[TicketHit]:
+    """
+    Ranked full-text search over ticket titles, descriptions and replies.
+    Every word must match, as a prefix ("modem los" finds "modems", "LOS").
+    Snippets are HTML: the ticket text is escaped and the matches are
+    marked with SNIPPET_START/SNIPPET_END.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    dialect = db.get_bind().dialect.name
+    _statements(dialect)
+
+    filters = ""
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    if user_id is not None:
+        filters += " AND t.user_id = :user_id"
+        params["user_id"] = user_id
+    if status is not None:
+        filters += " AND t.status = :status"
+        params["status"] = status
+
+    if dialect == "sqlite":
+        params.update(
+            match=" ".join(f'"{term}"*' for term in terms),
+            start=_MATCH_START,
+            end=_MATCH_END,
+            words=SNIPPET_WORDS,
+        )
+        statement = text(
+            f"SELECT t.id, -bm25(ticket_search, {_SQLITE_WEIGHTS}) AS score, "
+            "snippet(ticket_search, -1, :start, :end, '…', :words) AS snippet "
+            "FROM ticket_search JOIN support_tickets t ON t.id = ticket_search.rowid "
+            f"WHERE ticket_search MATCH :match{filters} "
+            "ORDER BY bm25(ticket_search, " + _SQLITE_WEIGHTS + "), t.id DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params.update(
+            match=" & ".join(f"{term}:*" for term in terms),
+            options=f'StartSel="{_MATCH_START}", StopSel="{_MATCH_END}", '
+                    f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}",
+        )
+        # Headlines need the full text, so they are built for the page only
+        statement = text(
+            "WITH query AS (SELECT to_tsquery('simple', :match) AS q), "
+            "hits AS ("
+            "SELECT t.id, ts_rank_cd(s.document, query.q) AS score "
+            "FROM ticket_search s JOIN support_tickets t ON t.id = s.ticket_id, query "
+            f"WHERE s.document @@ query.q{filters} "
+            "ORDER BY score DESC, t.id DESC LIMIT :limit OFFSET :offset"
+            ") "
+            "SELECT hits.id, hits.score, ts_headline('simple', concat_ws(' ', t.title, t.description, "
+            "(SELECT string_agg(r.message, ' ') FROM ticket_replies r WHERE r.ticket_id = t.id)), "
+            "query.q, :options) AS snippet "
+            "FROM hits JOIN support_tickets t ON t.id = hits.id, query "
+            "ORDER BY hits.score DESC, hits.id DESC"
+        )
+    return [
+        TicketHit(ticket_id, score, snippet_html(snippet))
+        for ticket_id, score, snippet in db.execute(statement, params)
+    ]
+
+
+if __name__ == "__main__":
+    from ..db import base_models  # noqa: F401  (registers every model)
+
+    session = SessionLocal()
+    try:
+        rebuild_search_index(session)
+        print("Ticket search index rebuilt")
+    finally:
+        session.close()
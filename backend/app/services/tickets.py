@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple, Union
+
+from sqlalchemy import String, event, func, inspect, select, tuple_, type_coerce, update
+from sqlalchemy.orm import Session
+
+from ..db.session import SessionLocal
+from ..models.support_ticket import (
+    PRIORITY_RANKS,
+    STATUS_RANKS,
+    SupportTicket,
+    TicketPriority,
+    TicketReply,
+    TicketStatus,
+)
+from ..models.user import User
+from ..schemas.support_ticket import TicketListItem, TicketListPage
+
+# Ticket columns derived from its replies
+COUNTER_ATTRIBUTES = ("reply_count", "last_reply_at", "last_activity_at")
+
+
+def _list_order(dialect: str):
+    """
+    Lists are ordered by these, all descending: one backward scan of
+    ix_support_tickets_inbox, and a single row-value comparison per page.
+    SQLite stores timestamps as text, with or without fractional seconds
+    depending on what wrote them, so there the cursor carries the stored
+    text itself and is compared as such.
+    """
+    last_activity_at = SupportTicket.last_activity_at
+    if dialect == "sqlite":
+        last_activity_at = type_coerce(last_activity_at, String)
+    return (SupportTicket.status_rank, SupportTicket.priority_rank, last_activity_at, SupportTicket.id)
+
+
+def priority_rank(priority: Any) -> int:
+    return PRIORITY_RANKS.get(getattr(priority, "value", priority), PRIORITY_RANKS[TicketPriority.MEDIUM.value])
+
+
+def status_rank(status: Any) -> int:
+    return STATUS_RANKS.get(getattr(status, "value", status), STATUS_RANKS[TicketStatus.OPEN.value])
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _rank_tickets(session: Session, flush_context, instances) -> None:
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, SupportTicket):
+            continue
+        new = obj in session.new
+        state = inspect(obj)
+        if new or state.attrs.priority.history.has_changes():
+            obj.priority_rank = priority_rank(obj.priority or TicketPriority.MEDIUM)
+        if new or state.attrs.status.history.has_changes():
+            obj.status_rank = status_rank(obj.status or TicketStatus.OPEN)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _count_replies(session: Session, flush_context) -> None:
+    """Recompute the reply counters of every ticket a flushed reply belongs to"""
+    ticket_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, TicketReply):
+            ticket_ids.add(obj.ticket_id)
+    for obj in session.dirty:
+        if isinstance(obj, TicketReply):
+            history = inspect(obj).attrs.ticket_id.history
+            if history.has_changes():
+                ticket_ids.update(history.added)
+                ticket_ids.update(history.deleted)
+    ticket_ids.discard(None)
+    if not ticket_ids:
+        return
+
+    replies = select(TicketReply).where(TicketReply.ticket_id == SupportTicket.id)
+    last_reply_at = replies.with_only_columns(func.max(TicketReply.created_at)).scalar_subquery()
+    session.connection().execute(
+        update(SupportTicket)
+        .where(SupportTicket.id.in_(sorted(ticket_ids)))
+        .values(
+            reply_count=replies.with_only_columns(func.count(TicketReply.id)).scalar_subquery(),
+            last_reply_at=last_reply_at,
+            last_activity_at=func.coalesce(last_reply_at, SupportTicket.created_at),
+        )
+    )
+    session.info.setdefault("recounted_tickets", set()).update(ticket_ids)
+
+
+@event.listens_for(SessionLocal, "after_flush_postexec")
+def _expire_counters(session: Session, flush_context) -> None:
+    # Loaded tickets reload their counters on next access
+    for ticket_id in session.info.pop("recounted_tickets", ()):
+        ticket = session.identity_map.get((SupportTicket, (ticket_id,), None))
+        if ticket is not None:
+            session.expire(ticket, COUNTER_ATTRIBUTES)
+
+
+def encode_cursor(status: int, priority: int, last_activity_at: Union[str, datetime], ticket_id: int) -> str:
+    if isinstance(last_activity_at, datetime):
+        last_activity_at = last_activity_at.isoformat()
+    key = [status, priority, last_activity_at, ticket_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, dialect: str) -> Tuple[int, int, Union[str, datetime], int]:
+    try:
+        status, priority, last_activity_at, ticket_id = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        last_activity_at = str(last_activity_at) if dialect == "sqlite" else datetime.fromisoformat(last_activity_at)
+        return int(status), int(priority), last_activity_at, int(ticket_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def ticket_page(
+    db: Session,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    user_id: Optional[int] = None,
+    after: Optional[str] = None,
+    limit: int = 50,
+) -> TicketListPage:
+    """
+    One page of tickets with their customer's name and reply counters, in a
+    single joined query. Ordered by status (open, in progress, resolved,
+    closed), then priority (most urgent first), then last activity (most
+    recent first), and keyset-paginated on that order: pass next_cursor
+    back as ``after``.
+    """
+    dialect = db.get_bind().dialect.name
+    order = _list_order(dialect)
+    query = (
+        db.query(
+            SupportTicket.id,
+            SupportTicket.user_id,
+            User.full_name.label("customer_name"),
+            SupportTicket.technician_id,
+            SupportTicket.title,
+            SupportTicket.category,
+            SupportTicket.status,
+            SupportTicket.status_rank,
+            SupportTicket.priority,
+            SupportTicket.priority_rank,
+            SupportTicket.reply_count,
+            SupportTicket.last_reply_at,
+            SupportTicket.last_activity_at,
+            SupportTicket.created_at,
+            order[2].label("activity_key"),
+        )
+        .join(User, User.id == SupportTicket.user_id)
+    )
+    if status is not None:
+        # The rank keeps the filter on the index; the name keeps it exact
+        query = query.filter(SupportTicket.status_rank == status_rank(status), SupportTicket.status == status)
+    if priority is not None:
+        query = query.filter(SupportTicket.priority == priority)
+    if user_id is not None:
+        query = query.filter(SupportTicket.user_id == user_id)
+    if after:
+        query = query.filter(tuple_(*order) < tuple_(*decode_cursor(after, dialect)))
+    rows = query.order_by(*(column.desc() for column in order)).limit(limit + 1).all()
+
+    items = [TicketListItem.model_validate(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.status_rank, last.priority_rank, last.activity_key, last.id)
+    return TicketListPage(items=items, next_cursor=next_cursor)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Stream a large bills CSV export and report throughput and peak Python memory.
+(Tracing allocations slows the export down several times; the peak is what
+matters here.)
+
+Seeds the database with synthetic bills when it has fewer than --rows, so
+point it at a scratch database. Run from the backend directory:
+    DATABASE_URL=sqlite:////tmp/export-bench.db python -m benchmarks.export --rows 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from app.db.base_models import Base
+from app.db.session import SessionLocal, engine
+from app.models.bill import Bill
+from app.models.package import Package
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services.exports import EXPORTS, ExportDataset, iter_csv
+
+BATCH = 50_000
+
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(Bill.id)).scalar()
+        if existing >= rows:
+            return
+        user = db.query(User).first()
+        if user is None:
+            user = User(username="bench", email="bench@example.com", hashed_password="x", full_name="Bench")
+            package = Package(name="Bench 50", description="bench", speed=50, price=350000)
+            db.add_all([user, package])
+            db.flush()
+            db.add(Subscription(user_id=user.id, package_id=package.id, status="active"))
+            db.commit()
+        subscription = db.query(Subscription).first()
+        start = datetime(2020, 1, 1)
+        for offset in range(existing, rows, BATCH):
+            db.execute(insert(Bill), [
+                {
+                    "subscription_id": subscription.id,
+                    "user_id": user.id,
+                    "amount": 350000,
+                    "tax": 38500,
+                    "total_amount": 388500,
+                    "bill_date": start + timedelta(minutes=i),
+                    "due_date": start + timedelta(days=14, minutes=i),
+                    "payment_status": "paid" if i % 3 else "pending",
+                }
+                for i in range(offset, min(offset + BATCH, rows))
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    columns = list(EXPORTS[ExportDataset.BILLS].default_columns)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = lines = 0
+    for chunk in iter_csv(ExportDataset.BILLS, columns):
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{lines - 1} rows ({size / 1e6:.1f} MB) in {elapsed:.2f} s, "
+        f"{(lines - 1) / elapsed:,.0f} rows/s, peak traced memory {peak / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
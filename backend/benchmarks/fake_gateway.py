@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Fake payment gateway: replay signed payment notifications for unpaid bills
+against a running server, in concurrent bursts and with duplicate deliveries,
+then wait until the bills show up as paid.
+
+The server and this script must share DATABASE_URL and PAYMENT_WEBHOOK_SECRET.
+
+Run from the backend directory:
+    python -m benchmarks.fake_gateway --url http://localhost:8000 --bills 500 --duplicates 3
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+from app.core.config import settings
+from app.db import base_models  # noqa: F401  (registers every model)
+from app.db.session import SessionLocal
+from app.models.bill import Bill, PaymentStatus
+from app.services.qris import bill_number
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def make_events(bills, duplicates: int) -> list:
+    """One notification per bill, each delivered ``duplicates`` times, shuffled"""
+    events = []
+    for bill_id, amount in bills:
+        body = json.dumps({
+            "event_id": uuid.uuid4().hex,
+            "order_id": bill_number(bill_id),
+            "gross_amount": f"{amount:.2f}",
+            "transaction_status": "settlement",
+            "transaction_id": f"TRX-{bill_id}",
+            "settlement_time": datetime.now().isoformat(timespec="seconds"),
+        }).encode()
+        events.extend([body] * duplicates)
+    random.shuffle(events)
+    return events
+
+
+async def replay(url: str, events: list, concurrency: int) -> list:
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        async def deliver(body: bytes):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"{settings.API_V1_STR}/payments/webhook",
+                    content=body,
+                    headers={"Content-Type": "application/json", "X-Signature": sign(body)},
+                )
+                latencies.append(time.perf_counter() - start)
+                key = response.json().get("status") if response.status_code == 200 else response.status_code
+                statuses[key] = statuses.get(key, 0) + 1
+
+        await asyncio.gather(*(deliver(body) for body in events))
+    print("responses:", statuses)
+    return sorted(latencies)
+
+
+def unpaid_bills(limit: int) -> list:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Bill.id, Bill.total_amount)
+            .filter(Bill.payment_status != PaymentStatus.PAID)
+            .order_by(Bill.id)
+            .limit(limit)
+        )
+        return list(rows)
+    finally:
+        db.close()
+
+
+def count_paid(bill_ids) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Bill).filter(Bill.id.in_(bill_ids), Bill.payment_status == PaymentStatus.PAID).count()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--bills", type=int, default=500)
+    parser.add_argument("--duplicates", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    bills = unpaid_bills(args.bills)
+    events = make_events(bills, args.duplicates)
+    print(f"Replaying {len(events)} deliveries for {len(bills)} bills")
+
+    started = time.perf_counter()
+    latencies = asyncio.run(replay(args.url, events, args.concurrency))
+    elapsed = time.perf_counter() - started
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"acked in {elapsed:.2f} s, latency p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+    bill_ids = [bill_id for bill_id, _ in bills]
+    deadline = time.time() + 60
+    while (paid := count_paid(bill_ids)) < len(bill_ids) and time.time() < deadline:
+        time.sleep(0.5)
+    print(f"{paid}/{len(bill_ids)} bills paid after {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Time ImageOptimizer on a batch of phone-camera sized JPEGs, comparing the
+old on-loop pipeline (full decode, resize, two encodes) with the
+process-pool pipeline.
+
+Run from the backend directory:
+    python -m benchmarks.image_pipeline [count]
+"""
+
+import asyncio
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from app.core.image import ImageOptimizer, render_variants, shutdown_executor
+
+
+def make_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """A 12MP JPEG with enough detail that the encoder has real work to do"""
+    image = Image.effect_mandelbrot((width, height), (-2.0, -1.2, 1.0, 1.2), 100).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+def legacy_render(content: bytes, max_size, quality: int) -> dict:
+    # The previous implementation: no draft decoding, everything on the loop
+    image = Image.open(BytesIO(content))
+    image.load()
+    image.thumbnail(max_size, Image.LANCZOS)
+    webp, original = BytesIO(), BytesIO()
+    image.save(webp, format="WEBP", quality=quality)
+    image.save(original, format="JPEG", quality=quality)
+    return {"webp": webp.getvalue(), "original": original.getvalue()}
+
+
+async def run_pool(optimizer: ImageOptimizer, batch: list) -> None:
+    await asyncio.gather(*(optimizer.render(content) for content in batch))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    photo = make_photo()
+    batch = [photo] * count
+    optimizer = ImageOptimizer()
+    max_size = (optimizer.max_width, optimizer.max_height)
+    print(f"{count} photos, {len(photo) / 1024 / 1024:.1f} MB each")
+
+    start = time.perf_counter()
+    for content in batch:
+        legacy_render(content, max_size, optimizer.quality)
+    legacy = time.perf_counter() - start
+    print(f"legacy, on the event loop: {legacy:6.2f} s")
+
+    start = time.perf_counter()
+    for content in batch:
+        render_variants(content, max_size, optimizer.quality)
+    draft = time.perf_counter() - start
+    print(f"draft decode, single core: {draft:6.2f} s")
+
+    # Warm the pool up so process start-up isn't counted
+    asyncio.run(run_pool(optimizer, batch[:1]))
+    start = time.perf_counter()
+    asyncio.run(run_pool(optimizer, batch))
+    pooled = time.perf_counter() - start
+    print(f"process pool:              {pooled:6.2f} s  ({legacy / pooled:.1f}x)")
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare FastAPI's default list serialization with the TypeAdapter fast path.
+
+Run from the backend directory:
+    python -m benchmarks.serialization
+"""
+
+import json
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.responses import serialize_list
+from app.schemas.bill import Bill as BillSchema
+
+
+def make_rows(count: int) -> list:
+    """Build ORM-like bill rows without touching a database"""
+    now = datetime(2025, 1, 1)
+    return [
+        SimpleNamespace(
+            id=i,
+            subscription_id=i,
+            user_id=i,
+            amount=350000.0,
+            tax=38500.0,
+            total_amount=388500.0,
+            description=f"Internet 50 Mbps - Period {i}",
+            bill_date=now,
+            due_date=now + timedelta(days=14),
+            payment_status="pending",
+            payment_method=None,
+            payment_date=None,
+            payment_proof=None,
+            payment_reference=None,
+            notes=None,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+# FastAPI builds this once per route for response_model=List[BillSchema]
+response_field = TypeAdapter(List[BillSchema])
+
+
+def default_path(rows: list) -> bytes:
+    # Validate the rows, turn the models back into plain data, then json.dumps
+    models = response_field.validate_python(rows, from_attributes=True)
+    return json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+
+def main():
+    for count in (100, 1000):
+        rows = make_rows(count)
+        number = 2000 // count * 10
+        baseline = min(timeit.repeat(lambda: default_path(rows), number=number, repeat=5)) / number
+        fast = min(timeit.repeat(lambda: serialize_list(BillSchema, rows), number=number, repeat=5)) / number
+        print(
+            f"{count:>5} rows: default {baseline * 1000:8.2f} ms  "
+            f"fast {fast * 1000:8.2f} ms  ({baseline / fast:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
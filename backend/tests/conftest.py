@@ -0,0 +1,91 @@
+import itertools
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# Settings are read when the app is first imported, so point the database
+# and every file directory at a scratch location before that happens
+WORK_DIR = tempfile.mkdtemp(prefix="sekar-net-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(WORK_DIR, "uploads")
+os.environ["SNAPSHOT_DIR"] = os.path.join(WORK_DIR, "snapshots")
+os.environ["STORAGE_BACKEND"] = "local"
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db.base_models import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+# The services register their session hooks on import; load them all as the app does
+from app.main import app  # noqa: E402,F401
+from app.models.bill import Bill  # noqa: E402
+from app.models.package import Package  # noqa: E402
+from app.models.subscription import Subscription  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+_sequence = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user with the given role; returns (user, auth headers)"""
+
+    def _make_user(role: str = "customer"):
+        n = next(_sequence)
+        user = User(
+            username=f"{role}{n}",
+            email=f"{role}{n}@example.com",
+            hashed_password="x",
+            full_name=f"{role.title()} {n}",
+            role=role,
+        )
+        db.add(user)
+        db.commit()
+        return user, {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+    return _make_user
+
+
+@pytest.fixture
+def make_bill(db):
+    """Create an unpaid bill, with its package and subscription, for a user"""
+
+    def _make_bill(user: User, price: float = 350000):
+        package = Package(name=f"Home {next(_sequence)}", description="Test", speed=50, price=price)
+        db.add(package)
+        db.commit()
+        subscription = Subscription(
+            user_id=user.id, package_id=package.id, status="active", start_date=datetime(2025, 1, 1)
+        )
+        db.add(subscription)
+        db.commit()
+        bill = Bill(
+            subscription_id=subscription.id,
+            user_id=user.id,
+            amount=price,
+            tax=price * 0.11,
+            total_amount=price * 1.11,
+            bill_date=datetime(2025, 2, 1),
+            due_date=datetime(2025, 2, 15),
+        )
+        db.add(bill)
+        db.commit()
+        return bill
+
+    return _make_bill
@@ -0,0 +1,48 @@
+from app.models.bill import Bill, PaymentStatus
+from app.models.billing_summary import BillPackageSummary
+from app.models.package import Package
+from app.models.subscription import Subscription
+from app.services.exports import ExportDataset, export_query
+
+
+def package_count(db, package_id: int, status: str) -> int:
+    row = db.get(BillPackageSummary, (package_id, status), populate_existing=True)
+    return row.bill_count if row else 0
+
+
+def test_package_summary_follows_the_billed_package(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    billed_package = bill.package_id
+    assert billed_package == db.get(Subscription, bill.subscription_id).package_id
+    assert package_count(db, billed_package, PaymentStatus.PENDING) == 1
+
+    # The customer upgrades before paying the old bill
+    upgrade = Package(name="Upgrade", description="Test", speed=100, price=500000)
+    db.add(upgrade)
+    db.commit()
+    db.get(Subscription, bill.subscription_id).package_id = upgrade.id
+    db.commit()
+
+    bill.payment_status = PaymentStatus.PAID
+    db.commit()
+
+    assert bill.package_id == billed_package
+    assert package_count(db, billed_package, PaymentStatus.PENDING) == 0
+    assert package_count(db, billed_package, PaymentStatus.PAID) == 1
+    assert package_count(db, upgrade.id, PaymentStatus.PAID) == 0
+
+
+def test_bill_exports_name_the_billed_package(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    billed_name = db.get(Package, bill.package_id).name
+
+    upgrade = Package(name="Export Upgrade", description="Test", speed=100, price=500000)
+    db.add(upgrade)
+    db.commit()
+    db.get(Subscription, bill.subscription_id).package_id = upgrade.id
+    db.commit()
+
+    statement = export_query(ExportDataset.BILLS, ["id", "package_id", "package_name"]).where(Bill.id == bill.id)
+    assert db.execute(statement).one() == (bill.id, bill.package_id, billed_name)
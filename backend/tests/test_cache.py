@@ -0,0 +1,49 @@
+import httpx
+import pytest
+
+from app.api.endpoints.packages import catalog_cache
+from app.core.cache import VersionedResponseCache
+from app.core.config import settings
+from app.main import app
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = VersionedResponseCache(max_entries=2)
+    cache.set("a", b"[1]")
+    cache.set("b", b"[2]")
+    cache.get("a")
+    cache.set("c", b"[3]")
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_expired_entries_are_dropped_on_insert(monkeypatch):
+    cache = VersionedResponseCache(max_age=60)
+    clock = [1000.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: clock[0])
+    cache.set("old", b"[1]")
+
+    clock[0] += 61
+    cache.set("new", b"[2]")
+
+    assert len(cache) == 1
+    assert cache.get("new") is not None
+
+
+@pytest.mark.asyncio
+async def test_only_the_default_catalog_page_is_cached():
+    catalog_cache.bump()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for skip in range(20):
+            response = await client.get(f"{settings.API_V1_STR}/packages/", params={"skip": skip, "limit": 5})
+            assert response.status_code == 200
+        assert len(catalog_cache) == 0
+
+        first = await client.get(f"{settings.API_V1_STR}/packages/")
+        oversized = await client.get(f"{settings.API_V1_STR}/packages/", params={"limit": 100000})
+
+    assert len(catalog_cache) == 1
+    assert oversized.headers["etag"] == first.headers["etag"]
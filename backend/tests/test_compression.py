@@ -0,0 +1,50 @@
+import httpx
+import pytest
+from starlette.responses import StreamingResponse
+
+from app.core.middleware import CompressionMiddleware
+from app.main import app
+
+
+def streaming_app(chunks):
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def asgi(scope, receive, send):
+        response = StreamingResponse(body(), media_type="application/json")
+        await response(scope, receive, send)
+
+    return CompressionMiddleware(asgi, minimum_size=1000)
+
+
+async def get(asgi, path: str = "/") -> httpx.Response:
+    transport = httpx.ASGITransport(app=asgi)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": "gzip"})
+
+
+@pytest.mark.asyncio
+async def test_small_streamed_bodies_are_not_compressed():
+    response = await get(streaming_app([b'{"ok":', b" true", b"}"]))
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"ok": true}'
+
+
+@pytest.mark.asyncio
+async def test_large_streamed_bodies_are_compressed():
+    chunks = [b"[" + b'"row",' * 100, b'"row",' * 200 + b'"end"]']
+
+    response = await get(streaming_app(chunks))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"".join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_small_api_responses_pass_through_uncompressed():
+    response = await get(app, "/health")
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,33 @@
+from app.models.package import Package
+from app.services.invoices import invoice_sources
+
+
+def test_invoice_key_changes_with_the_customer_and_package(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    first = invoice_sources(db, [bill.id])[bill.id]
+
+    # Edits within the same second as the render, so timestamps alone can't tell
+    customer.full_name = "Renamed Customer"
+    db.commit()
+    renamed = invoice_sources(db, [bill.id])[bill.id]
+
+    package = db.get(Package, bill.package_id)
+    package.name = "Renamed Package"
+    db.commit()
+    repackaged = invoice_sources(db, [bill.id])[bill.id]
+
+    assert len({first.key, renamed.key, repackaged.key}) == 3
+    assert renamed.context["customer_name"] == "Renamed Customer"
+    assert repackaged.context["package_name"] == "Renamed Package"
+
+
+def test_invoice_key_is_stable_while_nothing_printed_changes(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    first = invoice_sources(db, [bill.id])[bill.id]
+
+    customer.hashed_password = "changed"
+    db.commit()
+
+    assert invoice_sources(db, [bill.id])[bill.id].key == first.key
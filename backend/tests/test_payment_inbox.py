@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+import app.services.payments as payments
+from app.core.config import settings
+from app.main import app
+from app.models.bill import Bill, PaymentStatus
+from app.models.payment_inbox import PaymentInbox
+from app.schemas.payment import PaymentNotification
+from app.services.payments import drain_inbox, payment_inbox, save_notification
+
+SECRET = "test-webhook-secret"
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_SECRET", SECRET)
+
+
+def notification(bill: Bill, event_id: str) -> PaymentNotification:
+    return PaymentNotification(
+        event_id=event_id,
+        reference=f"BILL-{bill.id:06d}",
+        amount=bill.total_amount,
+        status="settlement",
+    )
+
+
+def entry(db, event_id: str) -> PaymentInbox:
+    return db.query(PaymentInbox).filter(PaymentInbox.event_id == event_id).populate_existing().one()
+
+
+async def post_webhook(payload: dict) -> httpx.Response:
+    body = json.dumps(payload).encode()
+    signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(
+            f"{settings.API_V1_STR}/payments/webhook", content=body, headers={"X-Signature": signature}
+        )
+
+
+def test_saved_notifications_are_applied_once(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+
+    assert save_notification(db, notification(bill, "evt-apply"))
+    assert not save_notification(db, notification(bill, "evt-apply"))
+    drain_inbox(100)
+
+    db.refresh(bill)
+    assert bill.payment_status == PaymentStatus.PAID
+    assert entry(db, "evt-apply").processed_at is not None
+
+
+def test_failed_notifications_stay_in_the_inbox_for_a_retry(db, make_user, make_bill, monkeypatch):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    save_notification(db, notification(bill, "evt-retry"))
+
+    def unavailable(db, notifications):
+        raise RuntimeError("database went away")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(payments, "apply_notifications", unavailable)
+        drain_inbox(100)
+
+    failed = entry(db, "evt-retry")
+    assert failed.processed_at is None
+    assert failed.attempts == 1
+    assert failed.next_attempt_at > datetime.now()
+    assert "database went away" in failed.last_error
+
+    failed.next_attempt_at = datetime.now()
+    db.commit()
+    drain_inbox(100)
+    db.refresh(bill)
+    assert bill.payment_status == PaymentStatus.PAID
+
+
+@pytest.mark.asyncio
+async def test_webhook_refuses_events_while_the_worker_is_stopped():
+    assert not payment_inbox.running
+    response = await post_webhook({"event_id": "evt-stopped", "order_id": "BILL-000001", "amount": 1, "status": "paid"})
+
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_webhook_saves_before_acking_and_the_worker_applies(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    payload = {
+        "event_id": "evt-webhook",
+        "order_id": f"BILL-{bill.id:06d}",
+        "gross_amount": str(bill.total_amount),
+        "transaction_status": "settlement",
+    }
+
+    payment_inbox.start()
+    try:
+        first = await post_webhook(payload)
+        assert first.json() == {"status": "accepted"}
+        assert entry(db, "evt-webhook") is not None
+        assert (await post_webhook(payload)).json() == {"status": "duplicate"}
+
+        for _ in range(100):
+            db.refresh(bill)
+            if bill.payment_status == PaymentStatus.PAID:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await payment_inbox.stop()
+
+    assert bill.payment_status == PaymentStatus.PAID
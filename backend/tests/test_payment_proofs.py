@@ -0,0 +1,97 @@
+import os
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.stored_files import get_stored_file
+
+
+def write_upload(*parts: str, content: bytes) -> str:
+    path = os.path.join(settings.UPLOAD_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+async def download_proof(bill_id: int, headers: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(f"{settings.API_V1_STR}/bills/{bill_id}/payment-proof", headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_legacy_proofs_are_served_from_the_old_proof_directories(db, make_user, make_bill):
+    customer, headers = make_user()
+    bill = make_bill(customer)
+    write_upload("payment_proofs", f"payment_proof_{bill.id}.png", content=b"legacy proof")
+    bill.payment_proof = f"uploads/payment_proofs/payment_proof_{bill.id}.png"
+    db.commit()
+
+    response = await download_proof(bill.id, headers)
+
+    assert response.status_code == 200
+    assert response.content == b"legacy proof"
+
+
+@pytest.mark.asyncio
+async def test_legacy_paths_cannot_reach_other_stored_files(db, make_user, make_bill):
+    customer, headers = make_user()
+    bill = make_bill(customer)
+    invoice = write_upload("objects", "invoices", "1", "20250201.pdf", content=b"%PDF someone else")
+
+    for value in (
+        invoice,
+        "uploads/objects/invoices/1/20250201.pdf",
+        "uploads/payment_proofs/../objects/invoices/1/20250201.pdf",
+    ):
+        bill.payment_proof = value
+        db.commit()
+        assert (await download_proof(bill.id, headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_payment_updates_cannot_set_the_proof(db, make_user, make_bill):
+    customer, headers = make_user()
+    bill = make_bill(customer)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.put(
+            f"{settings.API_V1_STR}/bills/{bill.id}/pay",
+            json={
+                "payment_status": "pending",
+                "payment_method": "transfer",
+                "payment_date": "2025-02-10T09:00:00",
+                "payment_proof": "uploads/objects/invoices/1/20250201.pdf",
+            },
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    db.refresh(bill)
+    assert bill.payment_proof is None
+
+
+@pytest.mark.asyncio
+async def test_admin_updates_leave_the_proof_reference_alone(db, make_user, make_bill):
+    customer, _ = make_user()
+    _, admin_headers = make_user("admin")
+    bill = make_bill(customer)
+    digest = "ab" * 32
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.put(
+            f"{settings.API_V1_STR}/bills/{bill.id}",
+            json={"notes": "Checked by phone", "payment_proof": digest},
+            headers=admin_headers,
+        )
+
+    assert response.status_code == 200
+    db.refresh(bill)
+    assert bill.notes == "Checked by phone"
+    assert bill.payment_proof is None
+    assert get_stored_file(db, digest) is None
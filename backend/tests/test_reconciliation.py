@@ -0,0 +1,70 @@
+import io
+import json
+from datetime import datetime
+
+from app.models.bill import Bill, PaymentStatus
+from app.models.billing_summary import BillMonthlySummary
+from app.models.subscription import Subscription
+from app.services.reconciliation import OpenBillIndex, SettlementLine, read_settlement, reconcile, to_minor_units
+
+
+def paid_count(db) -> int:
+    row = db.get(BillMonthlySummary, ("2025-02", PaymentStatus.PAID), populate_existing=True)
+    return row.bill_count if row else 0
+
+
+def settlement(bill: Bill, line: int) -> SettlementLine:
+    return SettlementLine(line, f"BILL-{bill.id:06d}", to_minor_units(bill.total_amount), f"T{line}", "18/10/2026 10:00")
+
+
+def test_only_bills_still_open_are_applied(db, make_user, make_bill):
+    customer, _ = make_user()
+    open_bill, paid_meanwhile = make_bill(customer), make_bill(customer)
+    index = OpenBillIndex.load(db)
+    paid_meanwhile.payment_status = PaymentStatus.PAID
+    db.commit()
+    paid_before = paid_count(db)
+
+    report = reconcile(db, [settlement(open_bill, 1), settlement(paid_meanwhile, 2)], index=index)
+
+    assert report.applied
+    assert report.matched == 1
+    assert paid_count(db) == paid_before + 1
+    db.refresh(open_bill)
+    db.refresh(paid_meanwhile)
+    assert open_bill.payment_status == PaymentStatus.PAID
+    assert open_bill.payment_reference == "T1"
+    assert paid_meanwhile.payment_reference is None
+
+
+def test_paid_bills_move_the_subscription_forward(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    subscription = db.get(Subscription, bill.subscription_id)
+    subscription.billing_cycle = "quarterly"
+    subscription.next_payment_date = datetime(2025, 1, 31)
+    db.commit()
+
+    reconcile(db, [settlement(bill, 1)])
+
+    db.refresh(subscription)
+    assert subscription.last_payment_date == datetime(2026, 10, 18, 10, 0)
+    assert subscription.next_payment_date == datetime(2025, 4, 30)
+
+
+def test_malformed_json_rows_are_reported_not_raised(db, make_user, make_bill):
+    customer, _ = make_user()
+    bill = make_bill(customer)
+    rows = [
+        {"reference": f"BILL-{bill.id:06d}", "amount": {"value": 1}},
+        {"reference": f"BILL-{bill.id:06d}", "amount": [1, 2]},
+        {"reference": f"BILL-{bill.id:06d}", "amount": True},
+        {"reference": {"bill": bill.id}, "amount": "1000", "id": ["T9"]},
+    ]
+    stream = io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+    report = reconcile(db, read_settlement(stream, "settlement.jsonl"), apply=False)
+
+    assert report.total_lines == 4
+    assert report.matched == 0
+    assert [line.reason for line in report.unmatched] == ["Missing or unreadable amount"] * 3 + ["No bill reference"]
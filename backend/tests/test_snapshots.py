@@ -0,0 +1,39 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pyarrow.dataset as ds
+import pytest
+
+from app.core.config import settings
+from app.models.bill import Bill
+from app.services.snapshots import STATE_FILE, run_snapshot
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SNAPSHOT_LAG_SECONDS", 0)
+    return str(tmp_path)
+
+
+def test_rows_committed_after_their_window_are_picked_up(db, make_user, make_bill, snapshot_dir):
+    customer, _ = make_user()
+    make_bill(customer)
+    time.sleep(1.1)  # the database clock has whole seconds
+    run_snapshot(db, [Bill])
+    with open(os.path.join(snapshot_dir, STATE_FILE)) as f:
+        first_until = datetime.fromisoformat(json.load(f)["bills"])
+
+    # Stamped inside the first window by a transaction that committed after the run
+    late = make_bill(customer)
+    late.notes = "long transaction"
+    late.updated_at = first_until - timedelta(seconds=30)
+    db.commit()
+    time.sleep(1.1)
+    run_snapshot(db, [Bill])
+
+    bills = ds.dataset(os.path.join(snapshot_dir, "bills"), partitioning="hive").to_table()
+    assert late.id in bills.column("id").to_pylist()
+
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.core.storage import ContentStore, LocalStorage, S3Storage, StorageBackend
+
+BUCKET = "sekar-net-test"
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        yield LocalStorage(str(tmp_path / "objects"))
+        return
+
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        storage = S3Storage(
+            bucket=BUCKET,
+            prefix="uploads",
+            region="us-east-1",
+            access_key="test",
+            secret_key="test",
+        )
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+def local_file(tmp_path, content: bytes) -> str:
+    path = tmp_path / "upload.part"
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(StorageBackend):
+        async def read(self, key: str) -> bytes:
+            return b""
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.asyncio
+async def test_put_read_and_delete_prefix(backend, tmp_path):
+    temp_path = local_file(tmp_path, b"proof")
+    await backend.put_file("ab/cd/abcd", temp_path)
+    await backend.write("ab/cd/abcd_thumb.webp", b"thumb")
+    await backend.write("ab/cd/abce", b"other")
+
+    assert not os.path.exists(temp_path)
+    assert await backend.read("ab/cd/abcd") == b"proof"
+    assert await backend.exists("ab/cd/abcd_thumb.webp")
+    assert sorted(key for key, _ in backend.list_keys("ab/")) == ["ab/cd/abcd", "ab/cd/abcd_thumb.webp", "ab/cd/abce"]
+
+    await backend.delete_prefix("ab/cd/abcd")
+
+    assert not await backend.exists("ab/cd/abcd")
+    assert not await backend.exists("ab/cd/abcd_thumb.webp")
+    assert await backend.exists("ab/cd/abce")
+
+
+@pytest.mark.asyncio
+async def test_content_store_finds_blobs_and_variants(backend, tmp_path):
+    store = ContentStore(backend, str(tmp_path / "tmp"))
+    digest = "ab" * 32
+    await store.write(store.key_for(digest), b"proof")
+    await store.write(store.variant_key(digest, "_thumb.webp"), b"thumb")
+    await store.write("invoices/1/20250201.pdf", b"%PDF")
+
+    assert sorted((found, key) for found, key, _ in store.iter_blobs()) == [
+        (digest, store.key_for(digest)),
+        (digest, store.variant_key(digest, "_thumb.webp")),
+    ]
+
+    await store.delete(digest)
+    assert list(store.iter_blobs()) == []
+    assert await store.exists("invoices/1/20250201.pdf")
+
+
+def test_serve_offloads_the_download(backend):
+    response = backend.serve("ab/cd/abcd", "image/png", "proof.png", {"ETag": '"abcd"'})
+
+    if isinstance(backend, S3Storage):
+        assert isinstance(response, RedirectResponse)
+        assert response.status_code == 307
+        assert BUCKET in response.headers["location"]
+        assert "uploads/ab/cd/abcd" in response.headers["location"]
+    else:
+        assert isinstance(response, FileResponse)
+        assert response.headers["etag"] == '"abcd"'
+
+
+def test_accel_redirect_leaves_the_bytes_to_nginx(tmp_path):
+    backend = LocalStorage(str(tmp_path), accel_redirect_prefix="/protected-files/")
+
+    response = backend.serve("ab/cd/abcd", "image/png", "proof.png")
+
+    assert response.headers["x-accel-redirect"] == "/protected-files/ab/cd/abcd"
+    assert response.body == b""
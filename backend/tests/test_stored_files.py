@@ -0,0 +1,102 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.storage import StoredBlob, content_store
+from app.models.stored_file import StoredFile
+from app.services.stored_files import (
+    acquire_file,
+    purge_file,
+    purge_released_files,
+    release_file,
+    sweep_unreferenced_files,
+)
+
+
+def store(content: bytes) -> StoredBlob:
+    digest = hashlib.sha256(content).hexdigest()
+    path = content_store.backend.path_for(content_store.key_for(digest))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return StoredBlob(digest, len(content), created=True)
+
+
+def stored(digest: str) -> bool:
+    return os.path.exists(content_store.backend.path_for(content_store.key_for(digest)))
+
+
+def backdate(digest: str, seconds: int) -> None:
+    path = content_store.backend.path_for(content_store.key_for(digest))
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+@pytest.mark.asyncio
+async def test_released_content_is_purged_after_commit(db):
+    blob = store(b"released once")
+    acquire_file(db, blob)
+    db.commit()
+
+    release_file(db, blob.digest)
+    db.commit()
+    await purge_released_files(db)
+
+    assert not stored(blob.digest)
+    assert db.get(StoredFile, blob.digest, populate_existing=True) is None
+
+
+@pytest.mark.asyncio
+async def test_purge_keeps_content_referenced_again(db):
+    blob = store(b"released and re-uploaded")
+    acquire_file(db, blob)
+    db.commit()
+
+    # Released, then referenced again before the purge gets to run
+    release_file(db, blob.digest)
+    db.commit()
+    acquire_file(db, blob._replace(created=False))
+    db.commit()
+    await purge_released_files(db)
+
+    assert stored(blob.digest)
+    assert db.get(StoredFile, blob.digest, populate_existing=True).ref_count == 1
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_release_is_not_purged(db):
+    blob = store(b"released in a failed transaction")
+    acquire_file(db, blob)
+    db.commit()
+
+    release_file(db, blob.digest)
+    db.rollback()
+    await purge_released_files(db)
+    assert await purge_file(blob.digest) is False
+
+    assert stored(blob.digest)
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_old_orphans_and_missed_purges(db):
+    referenced = store(b"still referenced")
+    acquire_file(db, referenced)
+    missed = store(b"purge never ran")
+    acquire_file(db, missed)
+    db.commit()
+    release_file(db, missed.digest)
+    db.commit()
+
+    orphan = store(b"upload whose database step failed")
+    recent = store(b"upload still in flight")
+    for blob in (referenced, missed, orphan):
+        backdate(blob.digest, settings.STORAGE_ORPHAN_GRACE_SECONDS + 60)
+
+    assert await sweep_unreferenced_files(db) >= 2
+    assert stored(referenced.digest)
+    assert stored(recent.digest)
+    assert not stored(missed.digest)
+    assert not stored(orphan.digest)
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.services.subscriptions import change_status
+
+
+def test_ending_a_subscription_records_when():
+    subscription = Subscription(status=SubscriptionStatus.ACTIVE)
+    before = datetime.now()
+
+    change_status(subscription, SubscriptionStatus.INACTIVE)
+
+    assert subscription.end_date >= before
+    ended_at = subscription.end_date
+    change_status(subscription, SubscriptionStatus.CANCELLED)
+    assert subscription.end_date == ended_at
+
+
+def test_cancelling_runs_to_the_end_of_the_period_but_not_past_a_fixed_term():
+    period_end = datetime.now() + timedelta(days=10)
+    subscription = Subscription(status=SubscriptionStatus.ACTIVE)
+    change_status(subscription, SubscriptionStatus.CANCELLED, ended_at=period_end)
+    assert subscription.end_date == period_end
+
+    term_end = datetime.now() + timedelta(days=3)
+    fixed_term = Subscription(status=SubscriptionStatus.ACTIVE, end_date=term_end)
+    change_status(fixed_term, SubscriptionStatus.CANCELLED, ended_at=period_end)
+    assert fixed_term.end_date == term_end
+
+
+def test_reactivating_clears_a_past_end():
+    subscription = Subscription(status=SubscriptionStatus.CANCELLED, end_date=datetime.now() - timedelta(days=1))
+
+    change_status(subscription, SubscriptionStatus.ACTIVE)
+
+    assert subscription.status == SubscriptionStatus.ACTIVE
+    assert subscription.end_date is None
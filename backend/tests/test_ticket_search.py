@@ -0,0 +1,21 @@
+from app.models.support_ticket import SupportTicket
+from app.services.ticket_search import rebuild_search_index, search_tickets
+
+
+def test_snippets_escape_ticket_text_and_mark_matches(db, make_user):
+    customer, _ = make_user()
+    ticket = SupportTicket(
+        user_id=customer.id,
+        title="Modem mati",
+        description="<script>alert(1)</script> modem & router rusak",
+    )
+    db.add(ticket)
+    db.commit()
+    rebuild_search_index(db)
+
+    [hit] = search_tickets(db, "router", user_id=customer.id)
+
+    assert hit.ticket_id == ticket.id
+    assert "<script>" not in hit.snippet
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in hit.snippet
+    assert "&amp; <mark>router</mark> rusak" in hit.snippet
@@ -0,0 +1,64 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.models.support_ticket import SupportTicket, TicketPriority, TicketStatus
+from app.services.tickets import ticket_page
+
+
+def test_open_work_is_listed_before_finished_work(db, make_user):
+    customer, _ = make_user()
+    for title, status, priority in (
+        ("resolved", TicketStatus.RESOLVED, TicketPriority.URGENT),
+        ("open low", TicketStatus.OPEN, TicketPriority.LOW),
+        ("closed", TicketStatus.CLOSED, TicketPriority.URGENT),
+        ("in progress", TicketStatus.IN_PROGRESS, TicketPriority.MEDIUM),
+        ("open urgent", TicketStatus.OPEN, TicketPriority.URGENT),
+    ):
+        db.add(SupportTicket(user_id=customer.id, title=title, description=title, status=status, priority=priority))
+    db.commit()
+
+    titles, after = [], None
+    while True:
+        page = ticket_page(db, user_id=customer.id, after=after, limit=2)
+        titles += [item.title for item in page.items]
+        after = page.next_cursor
+        if after is None:
+            break
+
+    assert titles == ["open urgent", "open low", "in progress", "resolved", "closed"]
+
+
+def test_status_changes_move_the_ticket(db, make_user):
+    customer, _ = make_user()
+    ticket = SupportTicket(user_id=customer.id, title="t", description="d")
+    db.add(ticket)
+    db.commit()
+    assert ticket.status_rank == 3
+
+    ticket.status = TicketStatus.CLOSED
+    db.commit()
+
+    assert ticket.status_rank == 0
+    assert [item.id for item in ticket_page(db, status="closed", user_id=customer.id).items] == [ticket.id]
+
+
+@pytest.mark.asyncio
+async def test_unknown_filters_are_rejected(make_user):
+    _, headers = make_user("admin")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [
+            await client.get(f"{settings.API_V1_STR}/tickets/{path}", params=params, headers=headers)
+            for path, params in (
+                ("", {"status": "opened"}),
+                ("", {"priority": "critical"}),
+                ("me", {"status": "Open"}),
+                ("search", {"q": "modem", "status": "done"}),
+            )
+        ]
+
+    assert [response.status_code for response in responses] == [400] * 4
+    assert "expected one of" in responses[0].json()["detail"]
@@ -0,0 +1,81 @@
+import asyncio
+import gc
+import io
+import os
+import time
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.core.image import shutdown_executor
+from app.core.storage import content_store
+from app.main import app
+from app.models.bill import Bill, PaymentStatus
+
+UPLOADS = 12
+PROBE_INTERVAL = 0.005
+# Uploads that write, hash or commit on the loop thread stall it for well
+# over this; with that work awaited or in the threadpool it stays ~20 ms
+MAX_LOOP_LAG = 0.05
+
+
+def proof_image(seed: int) -> bytes:
+    # Random pixels do not compress, so each PNG is close to 1MB
+    image = Image.frombytes("RGB", (560, 560), os.urandom(560 * 560 * 3))
+    image.putpixel((0, 0), (seed % 256, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def probe_loop_lag(stop: asyncio.Event, lags: list) -> None:
+    """Record how late each short sleep wakes up while the uploads run"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_do_not_stall_the_event_loop(db, make_user, make_bill):
+    customer, headers = make_user()
+    warmup_bill = make_bill(customer)
+    bills = [make_bill(customer) for _ in range(UPLOADS)]
+    images = [proof_image(seed) for seed in range(UPLOADS + 1)]
+    content_store.ensure_dirs()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def upload(bill: Bill, data: bytes) -> httpx.Response:
+            return await client.post(
+                f"/api/v1/bills/{bill.id}/upload-payment-proof",
+                files={"file": ("proof.png", data, "image/png")},
+                headers=headers,
+            )
+
+        # First request: route setup, lazy imports and worker startup
+        assert (await upload(warmup_bill, images.pop())).status_code == 200
+
+        # Garbage left by earlier tests would otherwise make a full collection
+        # during the uploads stall the loop for hundreds of ms
+        gc.collect()
+        gc.freeze()
+        stop = asyncio.Event()
+        lags: list = []
+        probe = asyncio.create_task(probe_loop_lag(stop, lags))
+        try:
+            responses = await asyncio.gather(*(upload(bill, data) for bill, data in zip(bills, images)))
+        finally:
+            stop.set()
+            await probe
+            gc.unfreeze()
+            shutdown_executor()
+
+    assert [response.status_code for response in responses] == [200] * UPLOADS
+    for bill in bills:
+        db.refresh(bill)
+        assert bill.payment_status == PaymentStatus.PENDING_VERIFICATION
+    assert lags, "the probe never ran while uploads were in flight"
+    assert max(lags) < MAX_LOOP_LAG, f"event loop stalled for {max(lags) * 1000:.0f} ms"